@@ -1,13 +1,15 @@
 import streamlit as st
 import os
-import numpy as np
 from statistics_chatbot import (
    DatabaseClient
 )
 import time
-from bot import query_rag, initialize_milvus, query_handler
-from streamlit_pdf_viewer import pdf_viewer
+from bot import query_rag, initialize_milvus, aquery_handler, intent_router
+from query_pipeline import QueryPipeline
+from pdf_cache import PageSliceCache
+from chat_store import ChatHistoryStore, HOT_WINDOW
 from uuid import uuid4
+from concurrent.futures import wait
 
 # Initialize database client
 # Purpose: Create an instance of the database client for performance metrics
@@ -52,6 +54,9 @@ unanswerable_questions = {
         "What is the minimum grade required to enroll for a comprehensive examination".lower(),
     }
 
+# Thumbs widget value for each stored feedback, so a re-rendered message shows its saved rating
+FEEDBACK_VALUES = {"like": 1, "dislike": 0}
+
 # Purpose: Reset performance metrics in the database
 # Input: None
 # Output: Resets metrics and refreshes the app state
@@ -155,10 +160,13 @@ def display_performance_metrics():
 # Output: Updates metrics and chat history
 # Processing: Determines the question type and applies the corresponding metric update
 def handle_feedback(assistant_message_id):
-    previous_feedback = st.session_state.chat_history[assistant_message_id].get("feedback", None)
+    if f"feedback_{assistant_message_id}" not in st.session_state:
+        return
+    history = get_session_history()
+    previous_feedback = history.get(assistant_message_id).get("feedback", None)
     feedback = st.session_state.get(f"feedback_{assistant_message_id}", None)
     user_message_id = assistant_message_id.replace("assistant_message", "user_message", 1)
-    question = st.session_state.chat_history[user_message_id]["content"]
+    question = history.get(user_message_id)["content"]
 
     if question.lower().strip() in answerable_questions:
         if feedback == 1:
@@ -167,20 +175,20 @@ def handle_feedback(assistant_message_id):
             elif previous_feedback == "dislike":
                 db_client.increment_performance_metric("false_negative", -1)
                 db_client.increment_performance_metric("true_positive")
-            st.session_state.chat_history[assistant_message_id]["feedback"] = "like"
+            history.set_feedback(assistant_message_id, "like")
         elif feedback == 0:
             if previous_feedback == None:
                 db_client.increment_performance_metric("false_negative")
             elif previous_feedback == "like":
                 db_client.increment_performance_metric("true_positive", -1)
                 db_client.increment_performance_metric("false_negative")
-            st.session_state.chat_history[assistant_message_id]["feedback"] = "dislike"
+            history.set_feedback(assistant_message_id, "dislike")
         else:
             if previous_feedback == "like":
                 db_client.increment_performance_metric("true_positive", -1)
             elif previous_feedback == "dislike":
                 db_client.increment_performance_metric("false_negative", -1)
-            st.session_state.chat_history[assistant_message_id]["feedback"] = None
+            history.set_feedback(assistant_message_id, None)
     elif question.lower().strip() in unanswerable_questions:
         if feedback == 1:
             if previous_feedback == None:
@@ -188,20 +196,20 @@ def handle_feedback(assistant_message_id):
             elif previous_feedback == "dislike":
                 db_client.increment_performance_metric("false_positive", -1)
                 db_client.increment_performance_metric("true_negative")
-            st.session_state.chat_history[assistant_message_id]["feedback"] = "like"
+            history.set_feedback(assistant_message_id, "like")
         elif feedback == 0:
             if previous_feedback == None:
                 db_client.increment_performance_metric("false_positive")
             elif previous_feedback == "like":
                 db_client.increment_performance_metric("true_negative", -1)
                 db_client.increment_performance_metric("false_positive")
-            st.session_state.chat_history[assistant_message_id]["feedback"] = "dislike"
+            history.set_feedback(assistant_message_id, "dislike")
         else:
             if previous_feedback == "like":
                 db_client.increment_performance_metric("true_negative", -1)
             elif previous_feedback == "dislike":
                 db_client.increment_performance_metric("false_positive", -1)
-            st.session_state.chat_history[assistant_message_id]["feedback"] = None
+            history.set_feedback(assistant_message_id, None)
             
     db_client.update_performance_metrics()
 
@@ -221,31 +229,94 @@ def clean_repeated_text(text):
         seen.add(sentence) 
     return '. '.join(cleaned_sentences)
 
+#Purpose: Shares one page-slice cache between all sessions; 
+# Input: None; 
+# Output: PageSliceCache instance; 
+# Process: Created once per server process by st.cache_resource and reused by every script run.
+@st.cache_resource
+def get_page_cache():
+    return PageSliceCache()
+
+#Purpose: Loads the intent table once per server process; 
+# Input: None; 
+# Output: IntentRouter instance; 
+# Process: Embeds the intent examples on first use only, since route() reloads the table by itself when the intents file changes.
+@st.cache_resource
+def get_intent_router():
+    intent_router.load()
+    return intent_router
+
 # Purpose: Serve the PDF viewer based on query parameters
 # Input: Streamlit query parameters for file and page
 # Output: Displays the requested PDF page in the viewer
-# Processing: Opens the file if it exists and renders the specified page
+# Processing: Opens the file if it exists and renders the specified page from a cached single-page slice, falling back to the full document if slicing fails
 def serve_pdf():
+    from streamlit_pdf_viewer import pdf_viewer
+
     pdf_path = st.query_params.get("file")
     page = max(int(st.query_params.get("page", 1)), 1)
     if pdf_path:
         if os.path.exists(pdf_path):
             with st.spinner(f"Loading page..."):
+                try:
+                    # The slice is passed as bytes, so another session evicting it cannot break rendering
+                    viewer_input = get_page_cache().get_page(pdf_path, page)
+                    render_args = {"pages_to_render": [1]}
+                except Exception as e:
+                    print(f"Error extracting page {page} of {pdf_path}: {e}")
+                    viewer_input = pdf_path  # Fall back to shipping the whole document
+                    render_args = {"pages_to_render": [page], "scroll_to_page": page}
+                if viewer_input is None:
+                    st.error(f"Page {page} not found in {pdf_path}")
+                    return
                 col1, col2, col3 = st.columns([1, 2, 1])  # Adjust ratios as needed
                 with col2:
-                    pdf_viewer(pdf_path,width=2000,height=1000,pages_to_render=[page],scroll_to_page=page,render_text=True)     
+                    pdf_viewer(viewer_input,width=2000,height=1000,render_text=True,**render_args)
         else:
             st.error(f"PDF file not found at {pdf_path}")
     else:
         st.error("No PDF file specified in query parameters")
 
+#Purpose: Shares one chat history store between all sessions; 
+# Input: None; 
+# Output: ChatHistoryStore instance; 
+# Process: Created once per server process by st.cache_resource, compacting old history on startup.
+@st.cache_resource
+def get_chat_store():
+    store = ChatHistoryStore()
+    store.compact()
+    return store
+
+#Purpose: Returns the persistent chat history of the current browser session; 
+# Input: None; 
+# Output: SessionHistory instance; 
+# Process: Keeps the session ID in server-side session state, creating one on first use; it is never read from the URL, so a copied or shared link cannot open or write into another user's history.
+def get_session_history():
+    session_id = st.session_state.get("chat_session_id")
+    if session_id is None:
+        session_id = uuid4().hex
+        st.session_state.chat_session_id = session_id
+    return get_chat_store().session(session_id)
+
+#Purpose: Selects the chat messages to render; 
+# Input: None; 
+# Output: List of (message_id, message) pairs, oldest first; 
+# Process: Returns the in-memory window of recent messages, preceded by older messages loaded from disk when the user asks for them.
+def get_messages_to_render():
+    history = get_session_history()
+    loaded = st.session_state.get("older_messages_loaded", 0)
+    if history.has_older(loaded) and st.button("Load earlier messages"):
+        loaded += HOT_WINDOW
+        st.session_state.older_messages_loaded = loaded
+    return history.older(loaded) + history.recent()
+
 # Purpose: Render chat history with user and bot messages
-# Input: None (uses st.session_state.chat_history)
+# Input: None (uses the session's chat history)
 # Output: Displays messages and feedback options in the interface
 # Processing: Iterates through the chat history and renders each message
 def render_chat_history():
     """Render the chat history with feedback options."""
-    for message_id, message in st.session_state.chat_history.items():
+    for message_id, message in get_messages_to_render():
         if message['role'] == 'user':
             st.markdown(f"<div class='user-message'>{message['content']}</div>", unsafe_allow_html=True)
             st.feedback("thumbs",key=f"feedback_{message_id}",on_change=lambda: handle_feedback(message_id))
@@ -254,10 +325,10 @@ def render_chat_history():
 #Purpose: Initializes chat history and database setup; 
 # Input: None; 
 # Output: Session state and database initialized; 
-# Process: Checks chat_history in session state, creates it if missing, initializes performance metrics, and sets up vector store.
+# Process: Checks whether the session was initialized, initializes performance metrics if not, and sets up vector store.
 def create_user_session():
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = {}
+    if 'session_initialized' not in st.session_state:
+        st.session_state.session_initialized = True
         spinner_placeholder = st.empty()
         initialization_time = 170  # Set the initialization time in seconds
         with st.spinner("Initializing, Please Wait..."):
@@ -273,6 +344,7 @@ def create_user_session():
                     if remaining_time == initialization_time:
                           db_client.create_performance_metrics_table()
                           vector_store = initialize_milvus()
+                          get_intent_router()
                     # Exit the loop if initialization completes early
                     if st.session_state.get('milvus_initialized', False):
                         break
@@ -283,16 +355,17 @@ def create_user_session():
 #Purpose: Displays chat history with feedback options; 
 # Input: None; 
 # Output: Rendered user and bot messages; 
-# Process: Iterates through chat_history and renders messages with styles and feedback options for user inputs.
+# Process: Iterates through the session's chat history and renders messages with styles and feedback options for user inputs.
 def create_chat_history():
-    for message_id,message in st.session_state.chat_history.items():
+    for message_id,message in get_messages_to_render():
         if message['role'] == 'user':
             st.markdown(f"<div class='user-message'>{message['content']}</div>", unsafe_allow_html=True)
             st.feedback(
                 "thumbs",
                 key = f"feedback_{message_id}",
-                on_change = handle_feedback(message_id)
-            
+                default = FEEDBACK_VALUES.get(message.get("feedback")),
+                on_change = handle_feedback,
+                args = (message_id,)
             )
         else:
             st.markdown(f"<div class='bot-message'>{message['content']}</div>", unsafe_allow_html=True) 
@@ -300,26 +373,58 @@ def create_chat_history():
 #Purpose: Captures and stores user input in session state; 
 # Input: user_input (str); 
 # Output: Unique message ID and updated chat history; 
-# Process: Generates unique ID, stores input in chat_history, and renders it in the UI.
+# Process: Generates unique ID, stores input in the chat history, and renders it in the UI.
 def handle_user_input(user_input):
     unique_id = str(uuid4())
     user_message_id = f"user_message_{unique_id}"
-    st.session_state.chat_history[user_message_id] = {"role": "user", "content": user_input}
+    get_session_history().add(user_message_id, "user", user_input)
     st.markdown(f"<div class='user-message'>{user_input}</div>", unsafe_allow_html=True)
     return unique_id  # Return the unique ID for further processing
 
+#Purpose: Shares one query pipeline between all sessions; 
+# Input: None; 
+# Output: QueryPipeline instance; 
+# Process: Created once per server process by st.cache_resource and reused by every script run.
+@st.cache_resource
+def get_query_pipeline():
+    return QueryPipeline(aquery_handler)
+
+#Purpose: Waits for the query pipeline to answer a question; 
+# Input: user_input (str); 
+# Output: Response text, or None if the request deadline passed; 
+# Process: Submits the query, polls the future while showing the queue depth, and cancels the request if the script run is stopped (e.g. the user navigates away).
+def wait_for_response(user_input):
+    pipeline = get_query_pipeline()
+    future = pipeline.submit(user_input)
+    status_placeholder = st.empty()
+    try:
+        while not wait([future], timeout=0.5).done:
+            # Writing to the page lets Streamlit raise its stop/rerun exceptions here
+            stats = pipeline.stats()
+            waiting = sum(stage["waiting"] for stage in stats["stages"].values())
+            status_placeholder.caption(f"{stats['pending']} question(s) in progress, {waiting} waiting for a free slot")
+        return future.result()
+    except TimeoutError:
+        return None  # The pipeline deadline passed and the request was cancelled
+    finally:
+        future.cancel()
+        status_placeholder.empty()
+
 #Purpose: Generates and displays a bot response; 
 # Input: user_input (str), unique_id (str); 
 # Output: Updated chat history with bot response; 
-# Process: Queries response, cleans text, stores it in chat_history, and refreshes UI or shows an error.
+# Process: Queries response, cleans text, stores it in the chat history, and refreshes UI or shows an error.
 def generate_bot_response(user_input, unique_id):
     bot_message_id = f"bot_message_{unique_id}"
     with st.spinner("Response Generating, please wait..."):
-        rag_output = query_handler(user_input)
+        rag_output = wait_for_response(user_input)
+        if rag_output is None:
+            st.error("Sorry, your question took too long to answer. Please try again.")
+            return
         bot_response = rag_output[0] if isinstance(rag_output, tuple) else str(rag_output)
         cleaned_response = clean_repeated_text(bot_response)
         if cleaned_response:
-            st.session_state.chat_history[bot_message_id] = {"role": "bot", "content": cleaned_response}
+            get_session_history().add(bot_message_id, "bot", cleaned_response)
             st.rerun()
         else:
             st.error("Sorry, I couldn't find a response to your question.")
@@ -0,0 +1,248 @@
+"""
+Parameter sweep over chunking and retrieval settings, trading answer quality against index cost.
+
+For every chunk size and overlap the papers are split, deduplicated and indexed
+into a temporary Milvus Lite collection, the same way initialize_milvus does.
+Every k and score threshold is then scored on the labelled answerable and
+unanswerable questions from app.py with a local stand-in LLM, and the
+Pareto-optimal configurations (hit rate vs. query latency vs. index size) are
+reported.
+
+A question counts as a hit when the bot behaves as labelled: an answerable
+question retrieves a document above the threshold, an unanswerable one
+retrieves none and gets the no-context response.
+
+Usage (from the repository root):
+    python -m benchmarks.chunk_sweep --output sweep.json
+    python -m benchmarks.chunk_sweep --chunk-sizes 500,1000,2000 --overlaps 0,200 --ks 1,3 --thresholds 0.2,0.3
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import app
+import bot
+from benchmarks.fakes import FakeChatModel, get_fake_embedding_function
+from dedup import NearDuplicateFilter
+
+
+def parse_ints(spec):
+    return [int(value) for value in spec.split(",") if value.strip()]
+
+
+def parse_floats(spec):
+    return [float(value) for value in spec.split(",") if value.strip()]
+
+
+# Purpose: Measure the disk footprint of a Milvus Lite database
+# Input: Path of the database (a file, a directory, or both with sidecar files)
+# Output: Total size in bytes
+# Processing: Sums the sizes of every file whose path starts with the database path
+def index_size(uri):
+    total = 0
+    directory, name = os.path.split(uri)
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(name):
+            continue
+        if entry.is_file():
+            total += entry.stat().st_size
+        else:
+            for root, _, files in os.walk(entry.path):
+                total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+# Purpose: Load every page of the papers once for all sweep settings
+# Input: Paper directory and scratch directory
+# Output: List of page Documents
+# Processing: Runs load_pdfs_in_batches with a fresh processed-files cache so that no paper is skipped
+def load_pages(data_dir, scratch_dir):
+    original_cache_file = bot.CACHE_FILE
+    bot.CACHE_FILE = os.path.join(scratch_dir, "document_cache.pkl")
+    try:
+        return [doc for batch in bot.load_pdfs_in_batches(data_dir) for doc in batch]
+    finally:
+        bot.CACHE_FILE = original_cache_file
+
+
+# Purpose: Build a temporary index for one chunking setting
+# Input: Page Documents, embedder, chunk size, overlap and scratch directory
+# Output: Tuple of (vector store, dictionary with chunk count, build time and index size)
+# Processing: Splits, drops near-duplicates and indexes the chunks, timing the whole ingestion
+def build_index(pages, embeddings, chunk_size, chunk_overlap, scratch_dir):
+    from langchain_milvus import Milvus
+
+    uri = os.path.join(scratch_dir, f"sweep_{chunk_size}_{chunk_overlap}.db")
+    start = time.perf_counter()
+    chunks = bot.split_documents(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = NearDuplicateFilter(threshold=bot.DEDUP_THRESHOLD).filter(chunks)
+    vector_store = Milvus.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        collection_name="chunk_sweep",
+        connection_args={"uri": uri},
+        drop_old=True,
+    )
+    build_seconds = time.perf_counter() - start
+    return vector_store, {
+        "chunks": len(chunks),
+        "build_s": round(build_seconds, 3),
+        "index_mb": round(index_size(uri) / 1e6, 3),
+    }
+
+
+# Purpose: Score every k and threshold on the labelled questions for one index
+# Input: Vector store, labelled questions, k values, thresholds, document chain and repeat count
+# Output: List of result dictionaries, one per (k, threshold)
+# Processing: Searches once per question and k (the search does not depend on the threshold), then times
+#             selection and the stand-in LLM call per threshold; latency is the median over repeats
+def score_retrieval(vector_store, questions, ks, thresholds, document_chain, repeat):
+    results = []
+    for k in ks:
+        searches = []
+        for question, _ in questions:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                docs_and_scores = vector_store.similarity_search_with_score(question, k=k)
+                timings.append(time.perf_counter() - start)
+            searches.append((statistics.median(timings), docs_and_scores))
+
+        for threshold in thresholds:
+            retriever = bot.ScoreThresholdRetriever(vector_store=vector_store, score_threshold=threshold, k=k)
+            latencies = []
+            hits = {True: 0, False: 0}
+            for (question, answerable), (search_seconds, docs_and_scores) in zip(questions, searches):
+                start = time.perf_counter()
+                relevant_docs = retriever.select_relevant_documents(docs_and_scores)
+                if relevant_docs:
+                    document_chain.invoke({"input": question, "context": relevant_docs})
+                latencies.append((search_seconds + time.perf_counter() - start) * 1000)
+                hits[answerable] += bool(relevant_docs) == answerable
+
+            answerable_total = sum(1 for _, answerable in questions if answerable)
+            unanswerable_total = len(questions) - answerable_total
+            latencies.sort()
+            results.append({
+                "k": k,
+                "score_threshold": threshold,
+                "hit_rate": round((hits[True] + hits[False]) / len(questions), 4),
+                "answerable_recall": round(hits[True] / answerable_total, 4) if answerable_total else None,
+                "unanswerable_rejection": round(hits[False] / unanswerable_total, 4) if unanswerable_total else None,
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+            })
+    return results
+
+
+# Purpose: Select the configurations that no other configuration beats on every objective
+# Input: List of result dictionaries
+# Output: List of Pareto-optimal results, best hit rate first
+# Processing: Keeps a result unless another one is at least as good on hit rate, p95 latency and index size and strictly better on one
+def pareto_front(results):
+    def objectives(result):
+        return (-result["hit_rate"], result["p95_ms"], result["index_mb"])
+
+    front = []
+    for result in results:
+        mine = objectives(result)
+        dominated = False
+        for other in results:
+            theirs = objectives(other)
+            if all(t <= m for t, m in zip(theirs, mine)) and theirs != mine:
+                dominated = True
+                break
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: (-result["hit_rate"], result["p95_ms"], result["index_mb"]))
+
+
+def print_table(results, front):
+    header = f"  {'size':>5} {'overlap':>7} {'k':>3} {'thresh':>6} {'chunks':>7} {'index MB':>9} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'hit':>6} {'recall':>6} {'reject':>6}"
+    print(header)
+    for result in sorted(results, key=lambda result: (-result["hit_rate"], result["p95_ms"])):
+        marker = "*" if result in front else " "
+        print(
+            f"{marker} {result['chunk_size']:>5} {result['chunk_overlap']:>7} {result['k']:>3} {result['score_threshold']:>6.2f}"
+            f" {result['chunks']:>7} {result['index_mb']:>9.2f} {result['build_s']:>8.2f} {result['p50_ms']:>8.2f}"
+            f" {result['p95_ms']:>8.2f} {result['hit_rate']:>6.1%} {result['answerable_recall'] or 0:>6.1%}"
+            f" {result['unanswerable_rejection'] or 0:>6.1%}"
+        )
+    print("\n* Pareto-optimal (hit rate vs. p95 latency vs. index size)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking and retrieval parameters against index cost.")
+    parser.add_argument("--data-dir", default=bot.data_dir, help="Directory with the papers to index")
+    parser.add_argument("--chunk-sizes", default="500,1000,2000,4000", help="Comma-separated chunk sizes in characters")
+    parser.add_argument("--overlaps", default="0,100,200,400", help="Comma-separated chunk overlaps in characters")
+    parser.add_argument("--ks", default="1,3,5,10", help="Comma-separated k values")
+    parser.add_argument("--thresholds", default="0.1,0.2,0.3,0.4", help="Comma-separated score thresholds")
+    parser.add_argument("--embedder", choices=("hf", "fake"), default="hf", help="HuggingFace model or hashing fake")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stand-in LLM takes per answer")
+    parser.add_argument("--repeat", type=int, default=3, help="Searches per question (median is reported)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+
+    embeddings = get_fake_embedding_function() if args.embedder == "fake" else bot.get_embedding_function()
+    document_chain = create_stuff_documents_chain(FakeChatModel(latency=args.llm_latency), bot.create_prompt())
+    questions = [(question, True) for question in sorted(app.answerable_questions)]
+    questions += [(question, False) for question in sorted(app.unanswerable_questions)]
+
+    results = []
+    scratch_dir = tempfile.mkdtemp(prefix="chunk_sweep_")
+    try:
+        pages = load_pages(args.data_dir, scratch_dir)
+        if not pages:
+            parser.error(f"No PDF pages found in {args.data_dir}")
+        print(f"Loaded {len(pages)} pages from {args.data_dir}; {len(questions)} labelled questions\n")
+
+        for chunk_size in parse_ints(args.chunk_sizes):
+            for chunk_overlap in parse_ints(args.overlaps):
+                if chunk_overlap >= chunk_size:
+                    continue
+                vector_store, index = build_index(pages, embeddings, chunk_size, chunk_overlap, scratch_dir)
+                print(f"chunk_size={chunk_size} overlap={chunk_overlap}: {index['chunks']} chunks, "
+                      f"{index['index_mb']:.2f} MB, built in {index['build_s']:.2f} s")
+                for result in score_retrieval(vector_store, questions, parse_ints(args.ks),
+                                              parse_floats(args.thresholds), document_chain, args.repeat):
+                    results.append({"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, **index, **result})
+                vector_store.client.close()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    front = pareto_front(results)
+    print()
+    print_table(results, front)
+
+    if args.output:
+        result = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "current": {
+                    "chunk_size": bot.CHUNK_SIZE,
+                    "chunk_overlap": bot.CHUNK_OVERLAP,
+                    "k": bot.RETRIEVER_K,
+                    "score_threshold": bot.RETRIEVER_SCORE_THRESHOLD,
+                },
+                "args": {key: value for key, value in vars(args).items() if key != "output"},
+            },
+            "results": results,
+            "pareto": front,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
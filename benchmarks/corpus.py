@@ -0,0 +1,80 @@
+import os
+import random
+
+# Vocabulary the synthetic papers are written with
+WORDS = (
+    "software engineering model learning program analysis test fault localization vulnerability "
+    "detection dataflow graph neural network android malware logging workflow github precision "
+    "tuning mixed performance accuracy interface design element grouping multimodal dataset "
+    "evaluation baseline approach results table figure section method framework large language "
+    "code repository commit developer tool benchmark metric precision recall study empirical"
+).split()
+HEADER = "2024 IEEE/ACM 46th International Conference on Software Engineering (ICSE '24)"
+FOOTER = "Permission to make digital or hard copies of all or part of this work for personal or classroom use is granted without fee."
+LINES_PER_PAGE = 45
+WORDS_PER_LINE = 12
+
+
+# Purpose: Generate the text lines of one synthetic page
+# Input: Random generator, paper title and page number
+# Output: List of text lines
+# Processing: Repeats a running header and footer like real proceedings and fills the body with random words
+def synthetic_page_lines(rng, title, page_num):
+    lines = [HEADER, f"{title} - page {page_num}"]
+    for _ in range(LINES_PER_PAGE):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)))
+    lines.append(FOOTER)
+    return lines
+
+
+# Purpose: Serialize text pages into a minimal valid PDF file
+# Input: Output path and a list of pages, each a list of text lines
+# Output: PDF file written to disk
+# Processing: Writes catalog, page tree, a Helvetica font and one content stream per page, then the xref table
+def write_pdf(path, pages):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = "BT /F1 9 Tf 11 TL 50 760 Td " + " ".join(f"({line}) '" for line in escaped) + " ET"
+        stream = stream.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+# Purpose: Create a directory of synthetic research papers
+# Input: Target directory, number of papers, pages per paper and random seed
+# Output: List of generated PDF paths
+# Processing: Writes one PDF per paper with deterministic content for the given seed
+def generate_corpus(directory, papers, pages_per_paper=10, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(papers):
+        title = f"Synthetic Paper {index + 1}: " + " ".join(rng.choice(WORDS).title() for _ in range(5))
+        pages = [synthetic_page_lines(rng, title, page_num) for page_num in range(1, pages_per_paper + 1)]
+        path = os.path.join(directory, f"paper{index + 1}.pdf")
+        write_pdf(path, pages)
+        paths.append(path)
+    return paths
@@ -0,0 +1,123 @@
+import asyncio
+import random
+import re
+import time
+import zlib
+import httpx
+import numpy as np
+from httpx import HTTPStatusError
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import bot
+
+# Embedding size of sentence-transformers/all-MiniLM-L6-v2, so fakes work against the real index
+EMBEDDING_SIZE = 384
+# Function words ignored by the hashing embedder so content words dominate the similarity
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its of on or "
+    "that the their these this to was we were what when where which who why will with you".split()
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Local stand-in for ChatMistralAI with configurable latency and failure rates.
+    Rate-limit failures raise the same HTTPStatusError the Mistral client raises.
+    """
+    latency: float = 1.0
+    jitter: float = 0.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    answer: str = "This is a simulated answer based on the provided context."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _next_outcome(self):
+        """
+        Draw the simulated latency and HTTP status code for one call.
+        """
+        delay = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 500
+        return delay, 200
+
+    def _result(self, status_code):
+        if status_code != 200:
+            request = httpx.Request("POST", "https://api.mistral.ai/v1/chat/completions")
+            response = httpx.Response(status_code, request=request)
+            raise HTTPStatusError(f"Simulated HTTP {status_code}", request=request, response=response)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, status_code = self._next_outcome()
+        time.sleep(delay)
+        return self._result(status_code)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, status_code = self._next_outcome()
+        await asyncio.sleep(delay)
+        return self._result(status_code)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Cheap deterministic embedder based on feature hashing of lower-cased words.
+    Vectors are L2-normalized like the production model's, so texts sharing words
+    land close together and score thresholds behave plausibly without loading torch.
+    """
+    def __init__(self, size=EMBEDDING_SIZE):
+        self.size = size
+
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            if word in STOP_WORDS:
+                continue
+            digest = zlib.crc32(word.encode("utf-8"))
+            vector[digest % self.size] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+# Purpose: Create a deterministic embedder with the same dimensionality as the production model
+# Input: None
+# Output: Embeddings instance
+# Processing: Returns a HashingEmbeddings instance sized like all-MiniLM-L6-v2
+def get_fake_embedding_function():
+    return HashingEmbeddings(EMBEDDING_SIZE)
+
+
+# Purpose: Swap the chat model and optionally the embedder used by bot.py for local stand-ins
+# Input: FakeChatModel instance and an optional embeddings instance
+# Output: Function that restores the original factories
+# Processing: Replaces the cached factory functions in bot.py, points the intent router at the new embedder and empties the retrieval cache
+def install_fakes(chat_model, embeddings=None):
+    original = (bot.get_chat_model, bot.get_embedding_function, bot.intent_router.embedding_factory)
+
+    bot.get_chat_model = lambda: chat_model
+    if embeddings is not None:
+        bot.get_embedding_function = lambda: embeddings
+        bot.intent_router.embedding_factory = bot.get_embedding_function
+    bot.intent_router.load()
+    bot.retrieval_cache.clear()
+
+    def restore():
+        bot.get_chat_model, bot.get_embedding_function, bot.intent_router.embedding_factory = original
+        bot.intent_router.invalidate()
+        bot.retrieval_cache.clear()
+
+    return restore
@@ -0,0 +1,113 @@
+"""
+Import-time profile of the app, kept as a startup regression benchmark.
+
+Runs `python -X importtime` in fresh interpreters for each scenario, reports the
+total import time and the slowest top-level imports, and fails when a heavy
+ML module is pulled in at import time or when import time regresses against a
+saved baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.importtime --output importtime.json
+    python -m benchmarks.importtime --compare importtime.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.report import Recorder, compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Code executed in a fresh interpreter for each scenario
+SCENARIOS = {
+    "import_app": "import app",
+    "import_bot": "import bot",
+}
+# Modules that must only be loaded on first use, never at import time
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain",
+    "langchain_huggingface",
+    "langchain_milvus",
+    "langchain_mistralai",
+    "pymilvus",
+    "PyPDF2",
+)
+
+
+# Purpose: Profile the imports of one scenario in a fresh interpreter
+# Input: Python code to run
+# Output: Tuple of (list of (self_us, cumulative_us, level, module) rows, set of loaded module names)
+# Processing: Runs the code under -X importtime, parses the stderr report and reads sys.modules from stdout
+def profile_imports(code):
+    probe = f"{code}\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        # Nested imports are indented by two spaces per level after the separator's own space
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), level, name.strip()))
+    modules = set(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return rows, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression benchmark for app.py.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per scenario (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to list")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression before failing")
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    profiles = {}
+    failed = False
+    for scenario, code in SCENARIOS.items():
+        totals = []
+        for _ in range(args.repeat):
+            rows, modules = profile_imports(code)
+            totals.append(sum(row[0] for row in rows) / 1000)
+        recorder.add(f"{scenario}/total_ms", statistics.median(totals), "ms", False)
+        recorder.add(f"{scenario}/modules", len(modules), "modules", False)
+
+        top_level = sorted((row for row in rows if row[2] == 0), key=lambda row: row[1], reverse=True)[:args.top]
+        profiles[scenario] = [{"module": row[3], "cumulative_ms": row[1] / 1000} for row in top_level]
+        for row in top_level:
+            print(f"    {row[1] / 1000:>10.1f} ms  {row[3]}")
+
+        heavy = sorted(name for name in HEAVY_MODULES if name in modules)
+        if heavy:
+            failed = True
+            print(f"  {scenario}: heavy modules loaded at import time: {', '.join(heavy)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"metrics": recorder.metrics, "top_imports": profiles}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(recorder.metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Check that the intent router never answers real questions with a canned response.
+
+Every labelled answerable and unanswerable question from app.py, and every
+negative example in intents.json, is matched against the intent examples.
+For each one the script prints the closest example, its cosine similarity and
+the margin to the effective threshold. It exits with status 1 if any of them
+would be routed to an intent. It also checks that every example still routes
+to its own intent.
+
+Usage (from the repository root):
+    python -m benchmarks.intent_check
+    python -m benchmarks.intent_check --embedder fake
+"""
+import argparse
+import json
+import sys
+
+import app
+import bot
+from benchmarks.fakes import get_fake_embedding_function
+from intent_router import INTENTS_FILE, IntentRouter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check intent routing against the labelled questions in app.py.")
+    parser.add_argument("--intents-file", default=INTENTS_FILE, help="Intents file to check")
+    parser.add_argument("--embedder", choices=("hf", "fake"), default="hf", help="HuggingFace model or hashing fake")
+    args = parser.parse_args()
+
+    embeddings = get_fake_embedding_function() if args.embedder == "fake" else bot.get_embedding_function()
+    router = IntentRouter(args.intents_file, lambda: embeddings)
+    router.load()
+
+    with open(args.intents_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    examples = [example for intent in config["intents"] for example in intent.get("examples", [])]
+    print(f"Configured threshold {config.get('threshold')}, effective threshold {router.threshold:.3f}\n")
+
+    questions = sorted(app.answerable_questions) + sorted(app.unanswerable_questions)
+    questions += [question for question in config.get("negatives", []) if question not in questions]
+    failures = []
+    print(f"{'similarity':>10} {'margin':>7}  question -> closest example")
+    for question in questions:
+        best, similarity = router.closest_example(question)
+        routed = router.route(question) is not None
+        if routed:
+            failures.append(question)
+        closest = examples[best] if best is not None else "-"
+        flag = "  ROUTED" if routed else ""
+        print(f"{similarity:>10.3f} {router.threshold - similarity:>+7.3f}  {question} -> {closest}{flag}")
+
+    missed = []
+    for intent in config["intents"]:
+        for example in intent.get("examples", []):
+            if router.route(example) != intent["response"]:
+                missed.append(example)
+
+    print(f"\n{len(failures)} of {len(questions)} non-catalogue questions routed to an intent")
+    print(f"{len(missed)} of {len(examples)} intent examples did not route to their own intent")
+    if failures or missed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+Load generator for the chatbot.
+
+Simulates N concurrent chat sessions driving the real app.py flow
+(process_user_input -> query pipeline -> aquery_handler) with a local fake LLM
+and, optionally, a fake embedder. The fake embedder gets its own scratch index
+of the papers, since its vectors cannot be compared with those of the real
+index. Reports throughput, latency percentiles, outcomes (including answers
+that found no context and never reached the LLM) and process RSS over time.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --sessions 20 --questions 10 --llm-latency 1.5 --llm-429-rate 0.05
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import app
+import bot
+from benchmarks.fakes import FakeChatModel, get_fake_embedding_function, install_fakes
+from chat_store import ChatHistoryStore
+from dedup import NearDuplicateFilter
+
+REQUESTS_FILE = "./requests.jsonl"
+DEFAULT_MIX = "answerable=4,unanswerable=3,catalogue=2,backlog=1"
+
+
+class RerunRequested(Exception):
+    """Raised by the simulated st.rerun(), mirroring Streamlit's own RerunException."""
+
+
+class SessionState(dict):
+    """Dictionary with attribute access, like st.session_state."""
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class SimulatedStreamlit:
+    """
+    Stand-in for the streamlit module inside app.py. Every worker thread gets its own
+    session state (and so its own chat session ID) and query parameters, UI calls are no-ops, and st.error() messages are recorded so the
+    harness can count them as failed requests.
+    """
+    def __init__(self, real_streamlit):
+        self._real = real_streamlit
+        self._local = threading.local()
+
+    @property
+    def session_state(self):
+        if not hasattr(self._local, "session_state"):
+            self._local.session_state = SessionState()
+        return self._local.session_state
+
+    @property
+    def errors(self):
+        if not hasattr(self._local, "errors"):
+            self._local.errors = []
+        return self._local.errors
+
+    @property
+    def query_params(self):
+        return self.session_state.setdefault("_query_params", {})
+
+    @contextmanager
+    def spinner(self, *args, **kwargs):
+        yield
+
+    def error(self, message, *args, **kwargs):
+        self.errors.append(message)
+
+    def rerun(self):
+        raise RerunRequested()
+
+    def empty(self):
+        return self
+
+    def cache_resource(self, *args, **kwargs):
+        return self._real.cache_resource(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # markdown, caption, feedback, ... have no effect in a simulated session
+        return lambda *args, **kwargs: self
+
+
+# Purpose: Read the resident set size of this process
+# Input: None
+# Output: RSS in megabytes
+# Processing: Reads VmRSS from /proc on Linux and falls back to the peak RSS from getrusage elsewhere
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Purpose: Sample RSS periodically in a background thread
+# Input: Sampling interval in seconds and a stop event
+# Output: List of (elapsed seconds, RSS MB) samples, filled until the event is set
+# Processing: Starts a daemon thread that appends one sample per interval
+def start_rss_sampler(interval, stop_event):
+    samples = []
+    start = time.perf_counter()
+
+    def sample():
+        while not stop_event.is_set():
+            samples.append((round(time.perf_counter() - start, 2), round(current_rss_mb(), 1)))
+            stop_event.wait(interval)
+
+    threading.Thread(target=sample, name="rss-sampler", daemon=True).start()
+    return samples
+
+
+# Purpose: Build the question pools the workload is drawn from
+# Input: Path to requests.jsonl
+# Output: Dictionary of category name to list of questions
+# Processing: Uses the labelled question sets from app.py, the intent examples and the backlog titles
+def load_question_pools(requests_file=REQUESTS_FILE):
+    pools = {
+        "answerable": sorted(app.answerable_questions),
+        "unanswerable": sorted(app.unanswerable_questions),
+        "catalogue": [],
+        "backlog": [],
+    }
+    with open(bot.INTENTS_FILE, "r", encoding="utf-8") as f:
+        for intent in json.load(f).get("intents", []):
+            pools["catalogue"].extend(intent.get("examples", []))
+    if os.path.exists(requests_file):
+        with open(requests_file, "r", encoding="utf-8") as f:
+            pools["backlog"] = [json.loads(line)["title"] for line in f if line.strip()]
+    return pools
+
+
+# Purpose: Parse a workload mix specification
+# Input: String such as "answerable=4,unanswerable=3"
+# Output: Dictionary of category name to relative weight
+# Processing: Splits on commas and equals signs and converts weights to floats
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# Purpose: Compute a percentile of a list of values
+# Input: List of numbers and the percentile (0-100)
+# Output: Percentile value using the nearest-rank method, or None for an empty list
+# Processing: Sorts the values and picks the nearest-rank element
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# Purpose: Classify the outcome of one simulated request
+# Input: Bot response text (or None) and the st.error messages recorded during the request
+# Output: "ok", "no_context", "rate_limited", "http_error", "timeout", "exception" or "no_response"
+# Processing: Compares the response with the fallback messages produced by bot.py and app.py
+def classify_response(response, errors):
+    if errors:
+        if errors[-1].startswith("exception:"):
+            return "exception"
+        return "timeout" if "too long" in errors[-1] else "no_response"
+    if response is None:
+        return "no_response"
+    # clean_repeated_text rewrites the multi-line message, so match its first sentence only
+    if response.startswith(bot.NO_CONTEXT_RESPONSE.split(".")[0]):
+        return "no_context"
+    if response.startswith(bot.RATE_LIMIT_RESPONSE):
+        return "rate_limited"
+    if response.startswith("HTTPStatusError"):
+        return "http_error"
+    return "ok"
+
+
+# Purpose: Index the papers with the given embedder in a scratch Milvus Lite database
+# Input: Embedder, paper directory and scratch directory
+# Output: Path of the scratch database
+# Processing: Loads, splits and deduplicates the papers the way initialize_milvus does and indexes them
+#             under the collection name bot.py loads, without touching the real index or its version stamp
+def build_scratch_index(embeddings, data_dir, scratch_dir):
+    from langchain_milvus import Milvus
+
+    original_cache_file = bot.CACHE_FILE
+    bot.CACHE_FILE = os.path.join(scratch_dir, "document_cache.pkl")
+    try:
+        pages = [doc for batch in bot.load_pdfs_in_batches(data_dir) for doc in batch]
+    finally:
+        bot.CACHE_FILE = original_cache_file
+
+    chunks = NearDuplicateFilter(threshold=bot.DEDUP_THRESHOLD).filter(bot.split_documents(pages))
+    uri = os.path.join(scratch_dir, "milvus_vector.db")
+    Milvus.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        collection_name="research_paper_chatbot",
+        connection_args={"uri": uri},
+        drop_old=True,
+    )
+    print(f"Indexed {len(chunks)} chunks with the fake embedder in {uri}")
+    return uri
+
+
+# Purpose: Choose a score threshold that suits the fake embedder
+# Input: Vector store built with the fake embedder and the number of documents k
+# Output: Threshold that best separates the labelled answerable and unanswerable questions in app.py
+# Processing: Takes the best normalized score of every labelled question and keeps the lowest candidate
+#             threshold with the most questions on the right side, so answerable questions reach the LLM
+def calibrate_threshold(vector_store, k):
+    from retriever import ScoreThresholdRetriever
+
+    labelled = [(question, True) for question in app.answerable_questions]
+    labelled += [(question, False) for question in app.unanswerable_questions]
+    scores = []
+    for question, answerable in labelled:
+        docs_and_scores = vector_store.similarity_search_with_score(question, k=k)
+        best = max((ScoreThresholdRetriever._normalize_score(score) for _, score in docs_and_scores), default=0.0)
+        scores.append((best, answerable))
+
+    def correct(threshold):
+        return sum((best >= threshold) == answerable for best, answerable in scores)
+
+    candidates = sorted({best for best, answerable in scores if answerable and best > 0})
+    return max(candidates, key=lambda threshold: (correct(threshold), -threshold), default=bot.RETRIEVER_SCORE_THRESHOLD)
+
+
+# Purpose: Return the bot reply added to the current simulated session
+# Input: Number of messages the session history had before the question
+# Output: Bot message text or None
+# Processing: Reads the newest message of the session history if the history grew and it came from the bot
+def new_bot_message(messages_before):
+    history = app.get_session_history()
+    recent = history.recent()
+    if len(history) > messages_before and recent and recent[-1][1]["role"] == "bot":
+        return recent[-1][1]["content"]
+    return None
+
+
+# Purpose: Run one simulated chat session
+# Input: Simulated streamlit module, questions to ask, think time, shared results list and lock
+# Output: Appends one result dictionary per question to the results list
+# Processing: Calls app.process_user_input for each question and times it end to end
+def run_session(sim, questions, think_time, results, lock):
+    for category, question in questions:
+        del sim.errors[:]
+        messages_before = len(app.get_session_history())
+        start = time.perf_counter()
+        try:
+            app.process_user_input(question)
+        except RerunRequested:
+            pass
+        except Exception as e:
+            sim.errors.append(f"exception: {type(e).__name__}: {e}")
+        latency = time.perf_counter() - start
+
+        response = new_bot_message(messages_before)
+        with lock:
+            results.append({
+                "category": category,
+                "latency": latency,
+                "outcome": classify_response(response, sim.errors),
+                "finished": time.perf_counter(),
+            })
+        if think_time:
+            time.sleep(random.uniform(0, 2 * think_time))
+
+
+# Purpose: Summarize the collected results
+# Input: Result dictionaries, wall-clock duration and RSS samples
+# Output: Report dictionary
+# Processing: Aggregates throughput, latency percentiles and outcome counts overall and per category
+def build_report(results, duration, rss_samples, config):
+    def latency_summary(rows):
+        latencies = [row["latency"] for row in rows]
+        return {
+            "count": len(rows),
+            "no_context": sum(1 for row in rows if row["outcome"] == "no_context"),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        }
+
+    outcomes = {}
+    for row in results:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    # A no-context answer is a valid reply (and expected for unanswerable questions), so it is reported
+    # separately rather than as an error
+    failed = sum(count for outcome, count in outcomes.items() if outcome not in ("ok", "no_context"))
+    categories = sorted({row["category"] for row in results})
+
+    rss_values = [rss for _, rss in rss_samples]
+    return {
+        "config": config,
+        "duration_s": round(duration, 3),
+        "requests": len(results),
+        "throughput_rps": round(len(results) / duration, 3) if duration else None,
+        "latency_s": latency_summary(results),
+        "latency_by_category_s": {c: latency_summary([r for r in results if r["category"] == c]) for c in categories},
+        "outcomes": outcomes,
+        "error_rate": round(failed / len(results), 4) if results else None,
+        "rss_mb": {
+            "start": rss_values[0] if rss_values else None,
+            "peak": max(rss_values) if rss_values else None,
+            "end": rss_values[-1] if rss_values else None,
+            "samples": rss_samples,
+        },
+    }
+
+
+# Purpose: Print the human-readable part of the report
+# Input: Report dictionary
+# Output: Summary lines on stdout
+# Processing: Formats throughput, latency, error and memory figures
+def print_report(report):
+    latency = report["latency_s"]
+    fmt = lambda value: "n/a" if value is None else f"{value:.3f}s"
+    print(f"Requests: {report['requests']} in {report['duration_s']}s ({report['throughput_rps']} req/s)")
+    print(f"Latency: p50={fmt(latency['p50'])} p95={fmt(latency['p95'])} p99={fmt(latency['p99'])} max={fmt(latency['max'])}")
+    for category, summary in report["latency_by_category_s"].items():
+        print(f"  {category:<12} n={summary['count']:<5} p50={fmt(summary['p50'])} p95={fmt(summary['p95'])} no_context={summary['no_context']}")
+    print(f"Outcomes: {report['outcomes']} (error rate {report['error_rate']})")
+    rss = report["rss_mb"]
+    print(f"RSS: start={rss['start']}MB peak={rss['peak']}MB end={rss['end']}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent chat sessions against app.py.")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of concurrent sessions")
+    parser.add_argument("--questions", type=int, default=5, help="Questions asked by each session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between questions in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Workload mix as category=weight pairs")
+    parser.add_argument("--requests-file", default=REQUESTS_FILE, help="JSONL file whose titles form the 'backlog' category")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Mean fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Standard deviation of the fake LLM latency")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="Fraction of LLM calls failing with HTTP 429")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls failing with HTTP 500")
+    parser.add_argument("--fake-embedder", action="store_true", help="Replace the HuggingFace embedder with a hash-based fake and index the papers with it")
+    parser.add_argument("--data-dir", default=bot.data_dir, help="Papers indexed for --fake-embedder")
+    parser.add_argument("--score-threshold", type=float, help="Retriever score threshold (default: bot.py's, or calibrated for --fake-embedder)")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="Seconds between RSS samples")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the workload and the fake LLM")
+    parser.add_argument("--output", help="Write the full report as JSON to this path")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    pools = load_question_pools(args.requests_file)
+    mix = {name: weight for name, weight in parse_mix(args.mix).items() if pools.get(name)}
+    if not mix:
+        parser.error("The workload mix does not select any available question category")
+
+    chat_model = FakeChatModel(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        rate_limit_rate=args.llm_429_rate,
+        error_rate=args.llm_error_rate,
+    )
+    embeddings = get_fake_embedding_function() if args.fake_embedder else None
+    restore = install_fakes(chat_model, embeddings)
+
+    sim = SimulatedStreamlit(app.st)
+    app.st = sim
+    # Keep simulated conversations out of the real chat history database
+    scratch_dir = tempfile.mkdtemp(prefix="load_test_")
+    original_milvus_uri = bot.MILVUS_URI
+    original_threshold = bot.RETRIEVER_SCORE_THRESHOLD
+    if embeddings is not None:
+        # Vectors of the fake embedder are meaningless against the MiniLM index, so search an index built with it
+        bot.MILVUS_URI = build_scratch_index(embeddings, args.data_dir, scratch_dir)
+        bot.get_vector_store.cache_clear()
+        if args.score_threshold is None:
+            # The hashing embedder scores lower than MiniLM, so the production threshold would reject nearly everything
+            args.score_threshold = round(calibrate_threshold(bot.get_vector_store(), bot.RETRIEVER_K), 4)
+            print(f"Calibrated score threshold for the fake embedder: {args.score_threshold}")
+    if args.score_threshold is not None:
+        bot.RETRIEVER_SCORE_THRESHOLD = args.score_threshold
+    chat_store = ChatHistoryStore(os.path.join(scratch_dir, "chat_history.db"))
+    original_get_chat_store = app.get_chat_store
+    app.get_chat_store = lambda: chat_store
+    # Warm up shared resources so the first sessions do not measure model and index loading
+    bot.get_embedding_function()
+    bot.get_vector_store()
+    app.get_query_pipeline()
+
+    workloads = []
+    for _ in range(args.sessions):
+        categories = random.choices(list(mix), weights=list(mix.values()), k=args.questions)
+        workloads.append([(category, random.choice(pools[category])) for category in categories])
+
+    results = []
+    lock = threading.Lock()
+    stop_event = threading.Event()
+    rss_samples = start_rss_sampler(args.rss_interval, stop_event)
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_session, args=(sim, questions, args.think_time, results, lock), name=f"session-{i}")
+        for i, questions in enumerate(workloads)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        duration = time.perf_counter() - start
+        stop_event.set()
+        app.st = sim._real
+        app.get_chat_store = original_get_chat_store
+        bot.MILVUS_URI = original_milvus_uri
+        bot.RETRIEVER_SCORE_THRESHOLD = original_threshold
+        bot.get_vector_store.cache_clear()
+        restore()
+        chat_store.connection.close()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    report = build_report(results, duration, rss_samples, config)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Microbenchmarks for the ingestion and retrieval hot paths in bot.py.
+
+Measures load_pdfs_in_batches, split_documents, embedding throughput per batch
+size, ScoreThresholdRetriever latency per k, clean_repeated_text and
+DatabaseClient feedback writes on synthetic corpora of increasing size.
+Results are written as JSON and can be compared against a saved baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.microbench --papers 7,100,1000 --output bench.json
+    python -m benchmarks.microbench --papers 7,100,1000 --compare bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import app
+import bot
+from benchmarks.corpus import WORDS, generate_corpus
+from benchmarks.fakes import get_fake_embedding_function
+from benchmarks.report import Recorder, compare
+from statistics_chatbot import DatabaseClient
+
+ALL_BENCHMARKS = ("load", "split", "embed", "retrieve", "clean", "db")
+
+
+# Purpose: Time a callable several times
+# Input: Zero-argument callable and number of repeats
+# Output: Tuple of (median seconds, result of the last call)
+# Processing: Runs the callable `repeat` times with perf_counter and keeps the median to damp noise
+def measure(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+# Purpose: Load every page of a corpus
+# Input: Corpus directory and scratch directory
+# Output: List of page Documents
+# Processing: Runs load_pdfs_in_batches to completion with a fresh processed-files cache, so no paper is skipped
+def load_corpus(corpus_dir, scratch_dir):
+    original_cache_file = bot.CACHE_FILE
+    bot.CACHE_FILE = os.path.join(scratch_dir, "document_cache.pkl")
+    try:
+        if os.path.exists(bot.CACHE_FILE):
+            os.remove(bot.CACHE_FILE)
+        return [doc for batch in bot.load_pdfs_in_batches(corpus_dir) for doc in batch]
+    finally:
+        bot.CACHE_FILE = original_cache_file
+
+
+# Purpose: Benchmark PDF loading
+# Input: Recorder, metric prefix, corpus directory, scratch directory and repeat count
+# Output: List of page Documents from the last run
+# Processing: Times load_corpus, which starts from an empty processed-files cache each time
+def bench_load(recorder, prefix, corpus_dir, scratch_dir, repeat):
+    seconds, documents = measure(lambda: load_corpus(corpus_dir, scratch_dir), repeat)
+    recorder.add(f"{prefix}/load_pdfs_in_batches/pages_per_s", len(documents) / seconds, "pages/s", True)
+    return documents
+
+
+# Purpose: Benchmark document splitting
+# Input: Recorder, metric prefix, page Documents and repeat count
+# Output: List of chunk Documents
+# Processing: Times split_documents over every page of the corpus
+def bench_split(recorder, prefix, documents, repeat):
+    seconds, chunks = measure(lambda: bot.split_documents(documents), repeat)
+    recorder.add(f"{prefix}/split_documents/chunks_per_s", len(chunks) / seconds, "chunks/s", True)
+    return chunks
+
+
+# Purpose: Benchmark embedding throughput for several batch sizes
+# Input: Recorder, metric prefix, embedder, chunk texts, batch sizes and repeat count
+# Output: None
+# Processing: Embeds the same sample of texts in slices of each batch size; HuggingFaceEmbeddings passes
+#             encode_kwargs to SentenceTransformer.encode, whose own batch_size (32 by default) is set to match
+def bench_embed(recorder, prefix, embeddings, texts, batch_sizes, repeat):
+    encode_kwargs = getattr(embeddings, "encode_kwargs", None)
+    try:
+        for batch_size in batch_sizes:
+            if encode_kwargs is not None:
+                embeddings.encode_kwargs = {**encode_kwargs, "batch_size": batch_size}
+
+            def embed_all():
+                for i in range(0, len(texts), batch_size):
+                    embeddings.embed_documents(texts[i:i + batch_size])
+            seconds, _ = measure(embed_all, repeat)
+            recorder.add(f"{prefix}/embed/batch_{batch_size}/texts_per_s", len(texts) / seconds, "texts/s", True)
+    finally:
+        if encode_kwargs is not None:
+            embeddings.encode_kwargs = encode_kwargs
+
+
+# Purpose: Benchmark retrieval latency for several k values
+# Input: Recorder, metric prefix, embedder, chunks, scratch directory, k values and queries
+# Output: None
+# Processing: Builds a temporary Milvus Lite index, then times get_relevant_documents per query for each k;
+#             the number of indexed chunks is recorded so capped runs are not mistaken for the full corpus
+def bench_retrieve(recorder, prefix, embeddings, chunks, scratch_dir, ks, queries):
+    from langchain_milvus import Milvus
+
+    # Milvus Lite only accepts [a-zA-Z0-9.-_] in database file names
+    uri = os.path.join(scratch_dir, f"{prefix.replace('=', '_').replace(',', '_')}_milvus.db")
+    start = time.perf_counter()
+    vector_store = Milvus.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        collection_name="microbench",
+        connection_args={"uri": uri},
+        drop_old=True,
+    )
+    build_seconds = time.perf_counter() - start
+    recorder.add(f"{prefix}/index_build/chunks", len(chunks), "chunks", True)
+    recorder.add(f"{prefix}/index_build/chunks_per_s", len(chunks) / build_seconds, "chunks/s", True)
+
+    for k in ks:
+        retriever = bot.ScoreThresholdRetriever(vector_store=vector_store, score_threshold=0.2, k=k)
+        retriever.get_relevant_documents(queries[0])  # Warm up
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            retriever.get_relevant_documents(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        recorder.add(f"{prefix}/retrieve/k_{k}/p50_ms", statistics.median(latencies), "ms", False)
+        recorder.add(f"{prefix}/retrieve/k_{k}/p95_ms", latencies[int(0.95 * (len(latencies) - 1))], "ms", False)
+
+
+# Purpose: Benchmark clean_repeated_text on long model outputs
+# Input: Recorder, sentence counts and repeat count
+# Output: None
+# Processing: Builds outputs where half of the sentences repeat earlier ones and times the cleanup
+def bench_clean(recorder, sentence_counts, repeat):
+    rng = random.Random(0)
+    for count in sentence_counts:
+        pool = [" ".join(rng.choice(WORDS) for _ in range(12)).capitalize() for _ in range(max(1, count // 2))]
+        text = ". ".join(rng.choice(pool) for _ in range(count)) + "."
+        seconds, _ = measure(lambda: app.clean_repeated_text(text), repeat)
+        recorder.add(f"clean_repeated_text/sentences_{count}/mb_per_s", len(text) / seconds / 1e6, "MB/s", True)
+
+
+# Purpose: Benchmark feedback writes to the performance metrics database
+# Input: Recorder, scratch directory and number of feedback events
+# Output: None
+# Processing: Replays like/dislike updates the way handle_feedback does: one increment plus a metrics recomputation
+def bench_db(recorder, scratch_dir, writes):
+    client = DatabaseClient(os.path.join(scratch_dir, "microbench_metrics.db"))
+    client.create_performance_metrics_table()
+    metrics = ["true_positive", "true_negative", "false_positive", "false_negative"]
+    start = time.perf_counter()
+    for i in range(writes):
+        client.increment_performance_metric(metrics[i % len(metrics)])
+        client.update_performance_metrics()
+    seconds = time.perf_counter() - start
+    client.connection.close()
+    recorder.add("database_client/feedback_writes_per_s", writes / seconds, "writes/s", True)
+
+
+def parse_ints(spec):
+    return [int(value) for value in spec.split(",") if value.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for bot.py ingestion and retrieval.")
+    parser.add_argument("--papers", default="7,100,1000", help="Comma-separated corpus sizes (up to 5000)")
+    parser.add_argument("--pages-per-paper", type=int, default=10, help="Pages in each synthetic paper")
+    parser.add_argument("--benchmarks", default=",".join(ALL_BENCHMARKS), help="Subset of: " + ", ".join(ALL_BENCHMARKS))
+    parser.add_argument("--embedder", choices=("hf", "fake"), default="hf", help="HuggingFace model or hashing fake")
+    parser.add_argument("--batch-sizes", default="1,8,32,128", help="Embedding batch sizes")
+    parser.add_argument("--embed-sample", type=int, default=512, help="Chunks embedded per batch-size measurement")
+    parser.add_argument("--index-chunks", type=int, default=0, help="Maximum chunks indexed for retrieval benchmarks (0 = all)")
+    parser.add_argument("--ks", default="1,3,5,10,20", help="k values for retrieval latency")
+    parser.add_argument("--sentences", default="100,1000,10000", help="Sentence counts for clean_repeated_text")
+    parser.add_argument("--db-writes", type=int, default=2000, help="Feedback events for the database benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per timing (median is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpora")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression before failing")
+    args = parser.parse_args()
+
+    selected = {name.strip() for name in args.benchmarks.split(",")}
+    unknown = selected - set(ALL_BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    embeddings = get_fake_embedding_function() if args.embedder == "fake" else bot.get_embedding_function()
+    queries = sorted(app.answerable_questions) + sorted(app.unanswerable_questions)
+    recorder = Recorder()
+    scratch_dir = tempfile.mkdtemp(prefix="microbench_")
+    try:
+        corpus_benchmarks = selected & {"load", "split", "embed", "retrieve"}
+        for papers in parse_ints(args.papers) if corpus_benchmarks else []:
+            prefix = f"papers={papers}"
+            corpus_dir = os.path.join(scratch_dir, f"corpus_{papers}")
+            generate_corpus(corpus_dir, papers, args.pages_per_paper, seed=args.seed)
+
+            # Later stages need the pages and chunks, but only the selected stages are timed and recorded
+            if "load" in selected:
+                documents = bench_load(recorder, prefix, corpus_dir, scratch_dir, args.repeat)
+            else:
+                documents = load_corpus(corpus_dir, scratch_dir)
+            if not selected & {"split", "embed", "retrieve"}:
+                continue
+            if "split" in selected:
+                chunks = bench_split(recorder, prefix, documents, args.repeat)
+            else:
+                chunks = bot.split_documents(documents)
+            if "embed" in selected:
+                texts = [chunk.page_content for chunk in chunks[:args.embed_sample]]
+                bench_embed(recorder, prefix, embeddings, texts, parse_ints(args.batch_sizes), args.repeat)
+            if "retrieve" in selected:
+                index_chunks = chunks[:args.index_chunks] if args.index_chunks else chunks
+                # A capped index is labelled with its real size instead of the corpus it was cut from
+                retrieve_prefix = prefix if len(index_chunks) == len(chunks) else f"{prefix},chunks={len(index_chunks)}"
+                bench_retrieve(recorder, retrieve_prefix, embeddings, index_chunks, scratch_dir, parse_ints(args.ks), queries)
+
+        if "clean" in selected:
+            bench_clean(recorder, parse_ints(args.sentences), args.repeat)
+        if "db" in selected:
+            bench_db(recorder, scratch_dir, args.db_writes)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "metrics": recorder.metrics,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(recorder.metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
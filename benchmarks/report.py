@@ -0,0 +1,29 @@
+class Recorder:
+    """Collects named metrics together with their unit and direction."""
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, higher_is_better):
+        self.metrics[name] = {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:<55} {value:>14.3f} {unit}")
+
+
+# Purpose: Compare a run against a saved baseline
+# Input: Current metrics, baseline metrics and relative tolerance
+# Output: List of regressed metric names
+# Processing: Prints the relative change per metric and flags changes in the wrong direction beyond the tolerance
+def compare(current, baseline, tolerance):
+    regressions = []
+    print(f"\n{'metric':<55} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, metric in current.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], metric["value"]
+        change = (new - old) / old if old else 0.0
+        worse = -change if metric["higher_is_better"] else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<55} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
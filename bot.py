@@ -1,22 +1,16 @@
+import asyncio
 import os
 import pickle
 import uuid
+from functools import lru_cache
 from dotenv import load_dotenv
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.schema import Document
-from langchain_core.prompts import PromptTemplate
-from langchain_mistralai.chat_models import ChatMistralAI
-from langchain_milvus import Milvus
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.chains import create_retrieval_chain
-from langchain_huggingface import HuggingFaceEmbeddings
-from pymilvus import connections, utility
-from httpx import HTTPStatusError
-from PyPDF2 import PdfReader
-from langchain.schema import BaseRetriever
-import numpy as np
-from pydantic import Field
-from typing import List, Any
+from intent_router import IntentRouter, INTENTS_FILE
+from dedup import NearDuplicateFilter
+from retrieval_cache import RetrievalCache, INDEX_VERSION_FILE
+
+# The langchain, Milvus, HuggingFace (torch) and PDF libraries are imported inside the
+# functions that use them, so importing this module (and app.py) stays cheap and the
+# PDF viewer route never loads the ML stack.
 
 # Load environment variables
 load_dotenv()
@@ -27,74 +21,23 @@ MILVUS_URI = "./milvus/milvus_vector.db"
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 data_dir = "./volumes"
 CACHE_FILE = "./document_cache.pkl"
+DEDUP_THRESHOLD = 0.8  # Estimated Jaccard similarity above which a chunk counts as a near-duplicate
+CHUNK_SIZE = 2000  # Characters per chunk
+CHUNK_OVERLAP = 200  # Characters shared by consecutive chunks
+RETRIEVER_K = 3  # Documents fetched from the vector store per query
+RETRIEVER_SCORE_THRESHOLD = 0.2  # Minimum normalized score for a document to be used as context
 
-# Purpose: Define the custom retriever logic for filtering relevant documents
-# Input: User query as a string
-# Output: List of relevant documents above the threshold score
-# Processing: Performs a similarity search on the vector store, filters documents based on score threshold
-class ScoreThresholdRetriever(BaseRetriever):
-    vector_store: Any = Field(..., description="Vector store for similarity search")
-    score_threshold: float = Field(default=0.1, description="Minimum score threshold for a document to be considered relevant")
-    k: int = Field(default=1, description="Number of documents to retrieve")
-
-    def get_relevant_documents(self, query:str) -> List[Any]:
-        """
-        Retrieve documents relevant to the query with a normalized score above the threshold.
-
-        Args:
-            query (str): Query string for searching the vector store.
-
-        Returns:
-            List[Document]: List of documents meeting the relevance criteria.
-        """
-        try:
-            docs_and_scores = self.vector_store.similarity_search_with_score(query, k=self.k)
-        except Exception as e:
-            print(f"Error during similarity search: {e}")
-            return [] # Return an empty list on search failure
-
-        if not docs_and_scores:
-            return [] # Handle cases where no documents are retrieved
-
-        # Initialize variables for tracking the most relevant document
-        highest_score = -1
-        most_relevant_document = None
-
-        for doc, score in docs_and_scores:
-            normalized_score = self._normalize_score(score)
-
-            # Check if the document is relevant and has a higher score than the current highest score
-            if normalized_score >= self.score_threshold and normalized_score > highest_score:
-                highest_score = normalized_score
-                most_relevant_document = doc
-                
-                most_relevant_document.metadata["score"] = normalized_score
-                most_relevant_document.metadata["title"] = doc.metadata.get("title", "Untitled")
-                most_relevant_document.metadata["source"] = doc.metadata.get("source", "Unknown")
-
-        return [most_relevant_document] if most_relevant_document else []
-    
-    @staticmethod
-    def _normalize_score(score):
-        """
-        Normalize the score to a range of [0, 1].
-
-        Args:
-            score (float): Raw similarity score.
-
-        Returns:
-            float: Normalized similarity score.
-        """
-        # Assuming Milvus L2 distance, adjust based on your distance metric
-        max_distance = np.sqrt(2)
-        normalized = 1 - (score / max_distance)
-        return max(0, min(1, normalized))
+# Query vectors and search results shared by all sessions
+retrieval_cache = RetrievalCache(INDEX_VERSION_FILE)
 
 # Purpose: Initialize the HuggingFace embedding function
 # Input: None
 # Output: Embedding function instance
-# Processing: Loads the HuggingFaceEmbeddings with a predefined model name
+# Processing: Loads the HuggingFaceEmbeddings with a predefined model name once and reuses it for later calls
+@lru_cache(maxsize=1)
 def get_embedding_function():
+    from langchain_huggingface import HuggingFaceEmbeddings
+
     embedding_function = HuggingFaceEmbeddings(model_name=MODEL_NAME)
     return embedding_function
 
@@ -103,7 +46,9 @@ def get_embedding_function():
 # Output: Yields a batch of documents extracted from PDFs
 # Processing: Loads PDF files, processes pages into Document objects, and caches processed files
 def load_pdfs_in_batches(data_dir, batch_size=20):
-    
+    from langchain.schema import Document
+    from PyPDF2 import PdfReader
+
     documents = []
     file_list = [f for f in os.listdir(data_dir) if f.endswith(".pdf")]
     processed_files = {}
@@ -147,21 +92,41 @@ def load_pdfs_in_batches(data_dir, batch_size=20):
     if not new_files:
         print("No new files to process.")
 
+# Responses returned when retrieval finds nothing or the LLM provider is rate limiting us
+NO_CONTEXT_RESPONSE = '''I regret to inform you that I could not find relevant context for your query. However, I am equipped to provide information related to <a href="https://dl.acm.org/doi/10.1145/3597503" target="_blank" style="color : black">  
+                    research papers</a>. Please do not hesitate to reach out with any inquiries regarding them.'''
+RATE_LIMIT_RESPONSE = "I am currently experiencing high traffic. Please try again later."
+
+# Purpose: Initialize the Mistral chat model
+# Input: None
+# Output: Chat model instance
+# Processing: Creates the ChatMistralAI client once and reuses it for later calls
+@lru_cache(maxsize=1)
+def get_chat_model():
+    from langchain_mistralai.chat_models import ChatMistralAI
+
+    model = ChatMistralAI(model='open-mistral-7b', api_key=MISTRAL_API_KEY, temperature=0.2)
+    print("Model Loaded")
+    return model
+
 # Purpose: Generate a response using RAG (Retrieval-Augmented Generation) model
 # Input: User query as a string
 # Output: Response text with citations
 # Processing: Loads model, sets up retrieval chain, and generates response using retrieved documents
 def query_rag(query):
-    
+    from httpx import HTTPStatusError
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from retriever import ScoreThresholdRetriever
+
     # Define the model
-    model = ChatMistralAI(model='open-mistral-7b', api_key=MISTRAL_API_KEY, temperature=0.2)
-    print("Model Loaded")
+    model = get_chat_model()
 
     prompt = create_prompt()
 
     # Load the vector store and create the retriever
     vector_store = load_exisiting_db(uri=MILVUS_URI)
-    retriever = ScoreThresholdRetriever(vector_store=vector_store, score_threshold=0.2, k=3)  # Adjust k as needed
+    retriever = ScoreThresholdRetriever(vector_store=vector_store, score_threshold=RETRIEVER_SCORE_THRESHOLD, k=RETRIEVER_K, cache=retrieval_cache)
     
     try:
         # Set up document and retrieval chains
@@ -179,48 +144,102 @@ def query_rag(query):
         response = retrieval_chain.invoke({"input": query})
         response_text = response.get("answer", "No answer found.")
 
-        # Collect unique links
-        unique_links = set()
-        if not relevant_docs:
-            return '''I regret to inform you that I could not find relevant context for your query. However, I am equipped to provide information related to <a href="https://dl.acm.org/doi/10.1145/3597503" target="_blank" style="color : black">  
-                    research papers</a>. Please do not hesitate to reach out with any inquiries regarding them.'''
-                   
-    
-        for doc in relevant_docs:
-            metadata = doc.metadata if hasattr(doc, "metadata") else {}
-            source = metadata.get("source", "Unknown").split("/")[-1]
-            page = metadata.get("page", "Unknown")
+        return format_rag_response(response_text, relevant_docs)
 
-            # Ensure page is an integer
-            try:
-                page = int(page)
-            except ValueError:
-                page = 1  # Default to page 1 if invalid
+    except HTTPStatusError as e:
+        print(f"HTTPStatusError: {e}")
+        if e.response.status_code == 429:
+            return RATE_LIMIT_RESPONSE
+        return f"HTTPStatusError: {e}"
 
-            # Create a unique link
-            if source != "Unknown":
-                link = f'<a href="/team4/?view=pdf&file={data_dir}/{source}&page={page}" target="_blank" style="color : white">[more_info]</a>'
-                unique_links.add(link)  # Adds only if link is unique
+# Purpose: Generate a RAG response asynchronously with bounded concurrency per stage
+# Input: User query as a string and a StageLimiter from the query pipeline
+# Output: Response text with citations
+# Processing: Embeds the query, searches the vector store and calls the document chain, each inside its own stage slot; skips the LLM when nothing relevant is found
+async def aquery_rag(query, limiter):
+    from httpx import HTTPStatusError
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from retriever import ScoreThresholdRetriever
+
+    loop = asyncio.get_running_loop()
+    vector_store = await loop.run_in_executor(None, get_vector_store)
+    retriever = ScoreThresholdRetriever(vector_store=vector_store, score_threshold=RETRIEVER_SCORE_THRESHOLD, k=RETRIEVER_K, cache=retrieval_cache)
+
+    # Repeated queries skip the embedding model and the vector store entirely
+    results_key, docs_and_scores = retrieval_cache.get_results(query, retriever.k)
+    if docs_and_scores is None:
+        try:
+            # The embedder and Milvus Lite are blocking, so both run on the default executor; the limiter keeps
+            # their slots until the threads finish, even if this request times out first
+            _, query_vector = retrieval_cache.get_vector(vector_store.embeddings, query)
+            if query_vector is None:
+                query_vector = await limiter.run_in_executor(
+                    "embed", retrieval_cache.embed_query, vector_store.embeddings, query
+                )
+            docs_and_scores = await limiter.run_in_executor(
+                "search", vector_store.similarity_search_with_score_by_vector, query_vector, retriever.k
+            )
+            retrieval_cache.put_results(results_key, docs_and_scores)
+        except Exception as e:
+            print(f"Error during similarity search: {e}")
+            docs_and_scores = []
 
-        # Append source links to response text
-        if unique_links:
-            response_text += f"\n\nSource: {''.join(unique_links)}"
+    relevant_docs = retriever.select_relevant_documents(docs_and_scores)
+    if not relevant_docs:
+        return NO_CONTEXT_RESPONSE
 
-        return response_text
+    try:
+        document_chain = create_stuff_documents_chain(get_chat_model(), create_prompt())
+        async with limiter.stage("llm"):
+            response_text = await document_chain.ainvoke({"input": query, "context": relevant_docs})
+        return format_rag_response(response_text, relevant_docs)
 
     except HTTPStatusError as e:
         print(f"HTTPStatusError: {e}")
         if e.response.status_code == 429:
-            return "I am currently experiencing high traffic. Please try again later."
+            return RATE_LIMIT_RESPONSE
         return f"HTTPStatusError: {e}"
 
+# Purpose: Attach citation links for the retrieved documents to the model answer
+# Input: Answer text and list of relevant documents
+# Output: Response text with source links, or the no-context response if nothing was retrieved
+# Processing: Builds one unique [more_info] link per source page and appends them to the answer
+def format_rag_response(response_text, relevant_docs):
+    # Collect unique links
+    unique_links = set()
+    if not relevant_docs:
+        return NO_CONTEXT_RESPONSE
+
+    for doc in relevant_docs:
+        metadata = doc.metadata if hasattr(doc, "metadata") else {}
+        source = metadata.get("source", "Unknown").split("/")[-1]
+        page = metadata.get("page", "Unknown")
+
+        # Ensure page is an integer
+        try:
+            page = int(page)
+        except ValueError:
+            page = 1  # Default to page 1 if invalid
+
+        # Create a unique link
+        if source != "Unknown":
+            link = f'<a href="/team4/?view=pdf&file={data_dir}/{source}&page={page}" target="_blank" style="color : white">[more_info]</a>'
+            unique_links.add(link)  # Adds only if link is unique
+
+    # Append source links to response text
+    if unique_links:
+        response_text += f"\n\nSource: {''.join(unique_links)}"
+
+    return response_text
+
 
 # Purpose: Create the prompt template for the RAG model
 # Input: None
 # Output: PromptTemplate object for the model
 # Processing: Defines a static template for generating answers to user queries
 def create_prompt():
-    
+    from langchain_core.prompts import PromptTemplate
+
     # Define the prompt template
     PROMPT_TEMPLATE = """
     Human: You are an AI assistant, and provides answers to questions by using fact based and statistical information when possible.
@@ -250,33 +269,43 @@ def create_prompt():
 # Purpose: Initialize the vector store for the RAG model
 # Input: URI string (optional), path to the local Milvus database
 # Output: Vector store created or loaded
-# Processing: Loads PDF documents in batches, splits them into chunks, and stores them in a Milvus vector store
+# Processing: Loads PDF documents in batches, splits them into chunks, drops near-duplicate chunks, and stores the rest in a Milvus vector store; bumps the index version if anything was written
 def initialize_milvus(uri: str=MILVUS_URI):
 
     embeddings = get_embedding_function()
     vector_store = None
+    dedup_filter = NearDuplicateFilter(threshold=DEDUP_THRESHOLD)
 
-    for documents in load_pdfs_in_batches(data_dir):
-        docs = split_documents(documents)
-        if vector_store is None:
-            vector_store = create_vector_store(docs, embeddings, uri)
-        else:
-            vector_store.add_documents(docs)
-
+    try:
+        for documents in load_pdfs_in_batches(data_dir):
+            docs = dedup_filter.filter(split_documents(documents))
+            if not docs:
+                continue
+            if vector_store is None:
+                vector_store = create_vector_store(docs, embeddings, uri)
+            else:
+                vector_store.add_documents(docs)
+    finally:
+        # Bumped even if ingestion fails halfway, since earlier batches may already be indexed
+        if vector_store is not None:
+            retrieval_cache.index_version.bump()
+
+    stats = dedup_filter.stats()
+    print(f"Near-duplicate chunks removed: {stats['removed']} of {stats['seen']} ({stats['removed_ratio']:.1%})")
     print("Vector store initialization complete.")
     return vector_store
 
 # Purpose: Split documents into smaller chunks for better processing
-# Input: List of Document objects
+# Input: List of Document objects, chunk size and overlap in characters (optional)
 # Output: List of chunked Document objects
 # Processing: Uses a text splitter to break large documents into smaller, more manageable chunks
-def split_documents(documents):
-    
+def split_documents(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     # Create a text splitter to split the documents into chunks
     text_splitter = RecursiveCharacterTextSplitter(
-        # Constants for embedding and chunking
-        chunk_size=2000,  # Split the text into chunks of 1000 characters
-        chunk_overlap=200,  # Overlap the chunks by 300 characters
+        chunk_size=chunk_size,  # Split the text into chunks of chunk_size characters
+        chunk_overlap=chunk_overlap,  # Overlap the chunks by chunk_overlap characters
         is_separator_regex=False,  # Don't split on regex
     )
     # Split the documents into chunks
@@ -288,6 +317,9 @@ def split_documents(documents):
 # Output: The created or loaded vector store
 # Processing: Connects to Milvus database, creates a collection, and stores the documents
 def create_vector_store(docs, embeddings, uri):
+    from langchain_milvus import Milvus
+    from pymilvus import connections, utility
+
     # Create the directory if it does not exist
     head = os.path.split(uri)
     os.makedirs(head[0], exist_ok=True)
@@ -321,7 +353,8 @@ def create_vector_store(docs, embeddings, uri):
 # Output: Loaded vector store
 # Processing: Connects to the existing Milvus database and loads the vector store
 def load_exisiting_db(uri=MILVUS_URI):
-    
+    from langchain_milvus import Milvus
+
     # Load an existing vector store
     vector_store = Milvus(
         collection_name="research_paper_chatbot",
@@ -331,6 +364,14 @@ def load_exisiting_db(uri=MILVUS_URI):
     print("Vector Store Loaded")
     return vector_store
 
+# Purpose: Share one loaded vector store across requests
+# Input: None
+# Output: Loaded vector store
+# Processing: Loads the existing Milvus database on first use and reuses it for later calls
+@lru_cache(maxsize=1)
+def get_vector_store():
+    return load_exisiting_db(uri=MILVUS_URI)
+
 # Purpose: Extract answer and source information from the RAG response
 # Input: Dictionary containing 'answer' and 'context' keys
 # Output: Formatted string containing the answer and up to 5 source references
@@ -356,34 +397,53 @@ def get_answer_with_source(response):
 
     return formatted_response
 
-# Hardcoded responses mapping
-HARDCODED_RESPONSES = {
-    "what papers do you have?": "Currently, I can help you with papers related to software engineering. I have 7 papers in total.These are the papers EGFE: End-to-end Grouping of Fragmented Elements in UI Designs with Multimodal Learning ,A Comprehensive Study of Learning-based Android Malware Detectors under Challenging Environments,UniLog: Automatic Logging via LLM and In-Context Learning,Predicting Performance and Accuracy of Mixed-Precision Programs for Precision Tuning,Large Language Models for Test-Free Fault Localization,Dataflow Analysis-Inspired Deep Learning for Efficient Vulnerability Detection,Toward Automatically Completing GitHubWorkflows",
-    "which conferences are these papers from?": "The papers are from 2024 IEEE/ACM 46th International Conference on Software Engineering (ICSE '24)",
-    "what conferences proceedings can you help with?": "The papers are from 2024 IEEE/ACM 46th International Conference on Software Engineering (ICSE '24)",
-    "how many papers do you know?": "I Know 7 papers in total,These are the papers EGFE: End-to-end Grouping of Fragmented Elements in UI Designs with Multimodal Learning ,A Comprehensive Study of Learning-based Android Malware Detectors under Challenging Environments,UniLog: Automatic Logging via LLM and In-Context Learning,Predicting Performance and Accuracy of Mixed-Precision Programs for Precision Tuning,Large Language Models for Test-Free Fault Localization,Dataflow Analysis-Inspired Deep Learning for Efficient Vulnerability Detection,Toward Automatically Completing GitHubWorkflows",
-    "what are the papers do you know?": "These are the papers EGFE: End-to-end Grouping of Fragmented Elements in UI Designs with Multimodal Learning ,A Comprehensive Study of Learning-based Android Malware Detectors under Challenging Environments,UniLog: Automatic Logging via LLM and In-Context Learning,Predicting Performance and Accuracy of Mixed-Precision Programs for Precision Tuning,Large Language Models for Test-Free Fault Localization,Dataflow Analysis-Inspired Deep Learning for Efficient Vulnerability Detection,Toward Automatically Completing GitHubWorkflows",
-}
+# Intent router answering catalogue-style questions from the intents file
+intent_router = IntentRouter(INTENTS_FILE, get_embedding_function, vector_cache=retrieval_cache)
 
 def query_handler(query):
     """
-    Handles user queries by checking for hardcoded responses first
-    and falling back to the RAG model if no match is found.
+    Handles user queries by checking the intent router for a canned response first
+    and falling back to the RAG model if no intent matches.
     Args:
         query (str): User's query string.
     Returns:
         str: Response text for the query.
     """
-    # Normalize the query for comparison
-    normalized_query = query.lower().strip()
-
-    # Check for hardcoded responses
-    if normalized_query in HARDCODED_RESPONSES:
-        return HARDCODED_RESPONSES[normalized_query]
+    # Check for canned responses to catalogue-style questions
+    response = intent_router.route(query)
+    if response is not None:
+        return response
 
-    # If no hardcoded response is found, proceed with the RAG model
+    # If no intent matches, proceed with the RAG model
     return query_rag(query)
 
+async def aquery_handler(query, limiter):
+    """
+    Async counterpart of query_handler, run on the shared query pipeline event loop.
+    Args:
+        query (str): User's query string.
+        limiter (StageLimiter): Per-stage concurrency limits of the pipeline.
+    Returns:
+        str: Response text for the query.
+    """
+    # Intent matching may embed the query, so it shares the embedding stage slots
+    response = await limiter.run_in_executor("embed", intent_router.route, query)
+    if response is not None:
+        return response
+
+    return await aquery_rag(query, limiter)
+
+
+# Purpose: Expose the retriever class without importing langchain at module import time
+# Input: Attribute name
+# Output: ScoreThresholdRetriever class
+# Processing: Imports retriever.py on first attribute access (PEP 562 module __getattr__)
+def __getattr__(name):
+    if name == "ScoreThresholdRetriever":
+        from retriever import ScoreThresholdRetriever
+        return ScoreThresholdRetriever
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
     pass
\ No newline at end of file
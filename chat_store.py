@@ -0,0 +1,249 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CHAT_HISTORY_DB = "./chat_history.db"
+HOT_WINDOW = 20  # Messages per session kept in memory
+IDLE_SESSION_SECONDS = 15 * 60  # Sessions idle this long are dropped from memory (they stay on disk)
+# Session IDs live only in Streamlit session state, so a history cannot be reopened after a page reload or
+# server restart; it is kept on disk just long enough to outlast an idle browser tab
+RETENTION_SECONDS = 24 * 3600  # Sessions idle this long are deleted from disk
+MAX_MESSAGES_PER_SESSION = 500  # Older messages beyond this are deleted from disk by compact()
+MAINTENANCE_INTERVAL = 60  # Seconds between idle-session sweeps
+EXPIRY_INTERVAL = 3600  # Seconds between sweeps that delete expired sessions from disk
+
+
+class SessionHistory:
+    """
+    Chat history of one session: the most recent messages are kept in memory and
+    everything is persisted to SQLite, so older turns are loaded only when asked for.
+    """
+    def __init__(self, store, session_id, hot_messages, message_count, next_seq):
+        """
+        Initialize the session with the hot window loaded from the database.
+        """
+        self.store = store
+        self.session_id = session_id
+        self._hot = OrderedDict(hot_messages)
+        self._message_count = message_count
+        self._next_seq = next_seq
+        self.last_access = time.monotonic()
+
+    def __len__(self):
+        return self._message_count
+
+# Purpose: Append a message to the session
+# Input: Message ID, role ("user" or "bot") and content
+# Output: None
+# Processing: Persists the message and adds it to the hot window, dropping the oldest in-memory message if the window is full
+
+    def add(self, message_id, role, content):
+        with self.store.lock:
+            self.store.connection.execute(
+                "INSERT INTO chat_messages (session_id, seq, message_id, role, content, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.session_id, self._next_seq, message_id, role, content, time.time()),
+            )
+            self.store.connection.commit()
+            self._next_seq += 1
+            self._message_count += 1
+            self._hot[message_id] = {"role": role, "content": content}
+            while len(self._hot) > self.store.hot_window:
+                self._hot.popitem(last=False)
+            self.last_access = time.monotonic()
+
+# Purpose: Look up a message by ID
+# Input: Message ID
+# Output: Message dictionary with role, content and feedback, or None
+# Processing: Checks the hot window first and falls back to the database for older messages
+
+    def get(self, message_id):
+        message = self._hot.get(message_id)
+        if message is not None:
+            return message
+        with self.store.lock:
+            row = self.store.connection.execute(
+                "SELECT role, content, feedback FROM chat_messages WHERE session_id = ? AND message_id = ?",
+                (self.session_id, message_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"role": row[0], "content": row[1], "feedback": row[2]}
+
+# Purpose: Record the feedback given on a message
+# Input: Message ID and feedback value ("like", "dislike" or None)
+# Output: None
+# Processing: Updates the hot copy and writes to the database only when the value changes; messages outside
+#             the hot window are compared against their stored row
+
+    def set_feedback(self, message_id, feedback):
+        message = self._hot.get(message_id)
+        if message is not None:
+            if message.get("feedback") == feedback:
+                return
+            message["feedback"] = feedback
+        with self.store.lock:
+            if message is None:
+                row = self.store.connection.execute(
+                    "SELECT feedback FROM chat_messages WHERE session_id = ? AND message_id = ?",
+                    (self.session_id, message_id),
+                ).fetchone()
+                if row is None or row[0] == feedback:
+                    return
+            self.store.connection.execute(
+                "UPDATE chat_messages SET feedback = ? WHERE session_id = ? AND message_id = ?",
+                (feedback, self.session_id, message_id),
+            )
+            self.store.connection.commit()
+
+# Purpose: Return the messages in the hot window
+# Input: None
+# Output: List of (message ID, message dictionary) pairs, oldest first
+# Processing: Copies the in-memory window and marks the session as active
+
+    def recent(self):
+        self.last_access = time.monotonic()
+        return list(self._hot.items())
+
+# Purpose: Load messages older than the hot window
+# Input: Maximum number of messages to load
+# Output: List of (message ID, message dictionary) pairs, oldest first
+# Processing: Reads the messages just before the hot window from the database without keeping them in memory
+
+    def older(self, limit):
+        older_count = self._message_count - len(self._hot)
+        if older_count <= 0 or limit <= 0:
+            return []
+        with self.store.lock:
+            rows = self.store.connection.execute(
+                """SELECT message_id, role, content, feedback FROM chat_messages
+                   WHERE session_id = ? ORDER BY seq DESC LIMIT ? OFFSET ?""",
+                (self.session_id, min(limit, older_count), len(self._hot)),
+            ).fetchall()
+        return [(row[0], {"role": row[1], "content": row[2], "feedback": row[3]}) for row in reversed(rows)]
+
+    def has_older(self, loaded=0):
+        return self._message_count - len(self._hot) > loaded
+
+
+class ChatHistoryStore:
+    """
+    SQLite-backed store of chat histories keyed by session ID, shared by all sessions.
+    Only active sessions and their hot windows are kept in memory; idle sessions are
+    evicted and reloaded from disk on their next request.
+    """
+    def __init__(self, db_path=CHAT_HISTORY_DB, hot_window=HOT_WINDOW, idle_seconds=IDLE_SESSION_SECONDS):
+        """
+        Initialize the database connection and create the messages table if needed.
+        """
+        self.hot_window = hot_window
+        self.idle_seconds = idle_seconds
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._sessions = {}
+        self._last_maintenance = time.monotonic()
+        self._last_expiry = self._last_maintenance
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    feedback TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                )
+            ''')
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_messages_message ON chat_messages (session_id, message_id)"
+            )
+
+# Purpose: Get the history of a session
+# Input: Session ID
+# Output: SessionHistory instance
+# Processing: Returns the in-memory session or loads its hot window and counters from the database; sweeps idle
+#             and expired sessions periodically
+
+    def session(self, session_id):
+        with self.lock:
+            self._maybe_evict_idle()
+            history = self._sessions.get(session_id)
+            if history is None:
+                rows = self.connection.execute(
+                    """SELECT seq, message_id, role, content, feedback FROM chat_messages
+                       WHERE session_id = ? ORDER BY seq DESC LIMIT ?""",
+                    (session_id, self.hot_window),
+                ).fetchall()
+                count, max_seq = self.connection.execute(
+                    "SELECT COUNT(*), MAX(seq) FROM chat_messages WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                hot = [(row[1], {"role": row[2], "content": row[3], "feedback": row[4]}) for row in reversed(rows)]
+                history = SessionHistory(self, session_id, hot, count, (max_seq or 0) + 1)
+                self._sessions[session_id] = history
+            history.last_access = time.monotonic()
+            return history
+
+# Purpose: Drop idle sessions from memory
+# Input: None
+# Output: Number of sessions evicted
+# Processing: Removes sessions whose last access is older than the idle timeout; their messages remain in the database
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self.lock:
+            idle = [session_id for session_id, history in self._sessions.items() if history.last_access < cutoff]
+            for session_id in idle:
+                del self._sessions[session_id]
+        return len(idle)
+
+    def _maybe_evict_idle(self):
+        now = time.monotonic()
+        if now - self._last_maintenance >= MAINTENANCE_INTERVAL:
+            self._last_maintenance = now
+            self.evict_idle()
+        if now - self._last_expiry >= EXPIRY_INTERVAL:
+            self._last_expiry = now
+            self.expire()
+
+# Purpose: Delete sessions that can no longer be reached
+# Input: Retention in seconds
+# Output: Number of messages deleted
+# Processing: Deletes every session whose newest message is older than the retention, except sessions still in memory
+
+    def expire(self, retention_seconds=RETENTION_SECONDS):
+        with self.lock:
+            active = list(self._sessions)
+            placeholders = ",".join("?" * len(active))
+            with self.connection:
+                return self.connection.execute(
+                    f"""DELETE FROM chat_messages WHERE session_id IN (
+                           SELECT session_id FROM chat_messages WHERE session_id NOT IN ({placeholders})
+                           GROUP BY session_id HAVING MAX(created_at) < ?)""",
+                    (*active, time.time() - retention_seconds),
+                ).rowcount
+
+# Purpose: Bound the size of the database
+# Input: Retention in seconds and maximum messages kept per session
+# Output: Number of messages deleted
+# Processing: Deletes sessions idle longer than the retention, trims every session to its newest messages and checkpoints the WAL
+
+    def compact(self, retention_seconds=RETENTION_SECONDS, max_messages=MAX_MESSAGES_PER_SESSION):
+        with self.lock:
+            expired = self.expire(retention_seconds)
+            with self.connection:
+                trimmed = self.connection.execute(
+                    """DELETE FROM chat_messages WHERE seq <= (
+                           SELECT MAX(m.seq) FROM chat_messages m WHERE m.session_id = chat_messages.session_id) - ?""",
+                    (max_messages,),
+                ).rowcount
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            # Counters of in-memory sessions are stale after deletions, so reload them on next use
+            self._sessions.clear()
+        return expired + trimmed
+
+    def active_sessions(self):
+        return len(self._sessions)
@@ -0,0 +1,98 @@
+import re
+import zlib
+import numpy as np
+
+# Mersenne prime 2^31 - 1; keeps (a * x + b) inside uint64 and signatures inside uint32
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class NearDuplicateFilter:
+    """
+    Drops chunks whose estimated Jaccard similarity to an earlier chunk is above a threshold.
+    Each chunk gets a MinHash signature over its word shingles; LSH banding finds candidate
+    pairs in constant time per chunk and the signatures confirm them. State persists across
+    calls, so duplicates are detected across ingestion batches of the same run.
+    """
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=5, seed=1):
+        """
+        Initialize the hash permutations and choose the LSH band layout for the threshold.
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+        self.bands, self.rows = self._band_layout(threshold, num_perm)
+        self._buckets = {}
+        self._signatures = []
+        self.seen = 0
+        self.removed = 0
+
+# Purpose: Choose the number of LSH bands and rows per band
+# Input: Jaccard threshold and number of permutations
+# Output: Tuple (bands, rows) with bands * rows == num_perm
+# Processing: Picks the layout whose S-curve midpoint (1/bands)^(1/rows) is closest below the threshold, favouring recall since candidates are verified
+
+    @staticmethod
+    def _band_layout(threshold, num_perm):
+        layouts = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+        below = [(bands, rows) for bands, rows in layouts if (1 / bands) ** (1 / rows) <= threshold]
+        if not below:
+            return layouts[0]
+        return max(below, key=lambda layout: (1 / layout[0]) ** (1 / layout[1]))
+
+# Purpose: Compute the MinHash signature of a text
+# Input: Text string
+# Output: numpy uint32 array of length num_perm, or None for texts without words
+# Processing: Hashes word shingles with CRC32 and takes the minimum of every permuted hash
+
+    def signature(self, text):
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return None
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _PRIME
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+# Purpose: Remove near-duplicate documents
+# Input: List of Document objects
+# Output: List of Document objects without near-duplicates of this or earlier batches
+# Processing: Looks up LSH buckets for candidates, confirms them by signature agreement and indexes the chunks that are kept
+
+    def filter(self, documents):
+        kept = []
+        for doc in documents:
+            self.seen += 1
+            signature = self.signature(doc.page_content)
+            if signature is None:
+                kept.append(doc)
+                continue
+
+            keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+            candidates = {index for key in keys for index in self._buckets.get(key, ())}
+            if any(np.mean(self._signatures[index] == signature) >= self.threshold for index in candidates):
+                self.removed += 1
+                continue
+
+            index = len(self._signatures)
+            self._signatures.append(signature)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(index)
+            kept.append(doc)
+        return kept
+
+# Purpose: Report how many chunks were removed
+# Input: None
+# Output: Dictionary with seen, removed and kept counts and the removal ratio
+# Processing: Derives the counts from the running totals
+
+    def stats(self):
+        return {
+            "seen": self.seen,
+            "removed": self.removed,
+            "kept": self.seen - self.removed,
+            "removed_ratio": round(self.removed / self.seen, 4) if self.seen else 0.0,
+        }
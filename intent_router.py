@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import threading
+import numpy as np
+
+INTENTS_FILE = "./intents.json"
+DEFAULT_THRESHOLD = 0.8
+NEGATIVE_MARGIN = 0.01  # Gap kept between the closest negative example and the effective threshold
+
+# Purpose: Normalize a query so that trivial differences do not defeat an exact match
+# Input: Query string
+# Output: Lower-cased query without punctuation and with collapsed whitespace
+# Processing: Lower-cases, replaces punctuation with spaces and collapses runs of whitespace
+def normalize_intent_text(text):
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class IntentRouter:
+    """
+    Routes catalogue-style questions to canned responses without retrieval or LLM calls.
+    Intents and their paraphrases are read from a JSON file, embedded once, and matched
+    against incoming queries with a single matrix-vector product. The file is reloaded
+    automatically when it changes on disk.
+    """
+    def __init__(self, intents_file=INTENTS_FILE, embedding_factory=None, vector_cache=None):
+        """
+        Initialize the router with the intents file, a callable returning the embedding function and
+        an optional RetrievalCache whose query vectors are shared with retrieval.
+        """
+        self.intents_file = intents_file
+        self.embedding_factory = embedding_factory
+        self.vector_cache = vector_cache
+        self.threshold = DEFAULT_THRESHOLD
+        self._lock = threading.Lock()
+        self._mtime = None
+        # (exact-match table, responses, intent index of each example, example embedding matrix)
+        self._table = ({}, [], np.zeros(0, dtype=np.int64), None)
+
+# Purpose: Load the intent table and precompute the embedding matrix for every example
+# Input: None
+# Output: Router state replaced with the contents of the intents file
+# Processing: Parses the JSON file, builds the exact-match table, embeds all examples in one batch and L2-normalizes them;
+#             raises the threshold above the closest negative example so that known non-catalogue questions never route.
+#             If embedding fails, the exact-match table is still installed and the load is retried on the next query
+
+    def load(self):
+        with self._lock:
+            self._load_locked()
+
+    def _load_locked(self):
+        try:
+            mtime = os.path.getmtime(self.intents_file)
+        except OSError as e:
+            print(f"Intents file not found at {self.intents_file}: {e}")
+            return
+
+        # Record the attempt so a broken edit is only retried once the file changes again
+        self._mtime = mtime
+        exact = {}
+        responses = []
+        examples = []
+        example_intents = []
+        try:
+            with open(self.intents_file, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            threshold = float(config.get("threshold", DEFAULT_THRESHOLD))
+            negatives = [str(question) for question in config.get("negatives", [])]
+            for intent in config.get("intents", []):
+                responses.append(intent["response"])
+                for example in intent.get("examples", []):
+                    exact.setdefault(normalize_intent_text(example), len(responses) - 1)
+                    examples.append(example)
+                    example_intents.append(len(responses) - 1)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Error loading intents from {self.intents_file}: {e}")
+            return  # Keep serving the previous table
+
+        matrix = None
+        if examples and self.embedding_factory is not None:
+            try:
+                matrix, threshold = self._embed_examples(examples, negatives, threshold)
+            except Exception as e:
+                # Exact matches do not need the model, so keep answering them and retry the embedding on the next query
+                print(f"Error embedding intent examples, serving exact matches only: {e}")
+                self._mtime = None
+
+        self.threshold = threshold
+        self._table = (exact, responses, np.asarray(example_intents, dtype=np.int64), matrix)
+        print(f"Loaded {len(examples)} intent examples for {len(responses)} intents.")
+
+# Purpose: Embed the intent examples and check them against the negative examples
+# Input: Intent examples, negative examples and the configured threshold
+# Output: Tuple of (L2-normalized example matrix, effective threshold)
+# Processing: Embeds examples and negatives in one batch and raises the threshold above the closest negative
+
+    def _embed_examples(self, examples, negatives, threshold):
+        vectors = np.asarray(self.embedding_factory().embed_documents(examples + negatives), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        matrix = vectors[:len(examples)]
+        if negatives:
+            closest = float((vectors[len(examples):] @ matrix.T).max())
+            if closest >= threshold:
+                print(f"Intent threshold raised from {threshold} to {closest + NEGATIVE_MARGIN:.3f} to reject all negative examples.")
+                threshold = closest + NEGATIVE_MARGIN
+        return matrix, threshold
+
+# Purpose: Force the intent table to be rebuilt on the next query
+# Input: None
+# Output: None
+# Processing: Forgets the recorded modification time so route() reloads the file, e.g. after swapping the embedder
+
+    def invalidate(self):
+        self._mtime = None
+
+# Purpose: Reload the intent table if the file changed since the last load
+# Input: None
+# Output: None
+# Processing: Compares the file modification time with the one recorded at load time
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.intents_file)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load_locked()
+
+# Purpose: Find the canned response for a query
+# Input: User query as a string
+# Output: Response string if an intent matches above the threshold, otherwise None
+# Processing: Tries an exact match on the normalized text first, then a cosine-similarity check against all examples
+
+    def route(self, query):
+        self._reload_if_changed()
+
+        exact, responses, example_intents, matrix = self._table
+        index = exact.get(normalize_intent_text(query))
+        if index is not None:
+            return responses[index]
+
+        best, similarity = self.closest_example(query)
+        if best is not None and similarity >= self.threshold:
+            return responses[example_intents[best]]
+        return None
+
+# Purpose: Find the intent example closest to a query
+# Input: User query as a string
+# Output: Tuple of (index of the closest example or None if no examples are loaded, cosine similarity)
+# Processing: Embeds the query (through the vector cache if set, so retrieval reuses the vector) and takes
+#             the maximum of one matrix-vector product over the normalized examples
+
+    def closest_example(self, query):
+        matrix = self._table[3]
+        if matrix is None or not len(matrix):
+            return None, 0.0
+
+        embeddings = self.embedding_factory()
+        if self.vector_cache is not None:
+            vector = self.vector_cache.embed_query(embeddings, query)
+        else:
+            vector = embeddings.embed_query(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector /= max(np.linalg.norm(vector), 1e-12)
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+PAGE_CACHE_DIR = "./pdf_page_cache"
+PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+class PageSliceCache:
+    """
+    Size-bounded on-disk LRU cache of single-page PDFs cut from the source papers.
+    Entries are keyed by the SHA-256 of the source file and the page number, so a
+    replaced paper never serves stale pages. Citation links then ship one page to
+    the browser instead of the whole paper.
+    """
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES):
+        """
+        Initialize the cache directory and the in-memory file hash memo.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+# Purpose: Hash a source PDF without rereading it on every request
+# Input: Path to the PDF
+# Output: Hex SHA-256 digest of the file contents
+# Processing: Reuses the digest while the file's size and modification time are unchanged
+
+    def _file_hash(self, pdf_path):
+        stat = os.stat(pdf_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._file_hashes.get(pdf_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self._file_hashes[pdf_path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+# Purpose: Return a standalone PDF containing one page of a paper
+# Input: Path to the source PDF and 1-based page number
+# Output: Contents of the single-page PDF as bytes, or None if the page does not exist
+# Processing: Reads the cached slice if present (refreshing its LRU timestamp), otherwise extracts the page, writes it atomically and evicts old slices;
+#             returning the bytes rather than the path means a slice evicted by another session can never disappear before it is rendered
+
+    def get_page(self, pdf_path, page):
+        slice_path = os.path.join(self.cache_dir, f"{self._file_hash(pdf_path)[:32]}_p{page}.pdf")
+        try:
+            os.utime(slice_path)
+            with open(slice_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass  # Not cached yet, or evicted by another session
+
+        from PyPDF2 import PdfReader, PdfWriter
+
+        reader = PdfReader(pdf_path)
+        if not 1 <= page <= len(reader.pages):
+            return None
+        writer = PdfWriter()
+        writer.add_page(reader.pages[page - 1])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        data = buffer.getvalue()
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, slice_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self._evict(keep=slice_path)
+        return data
+
+# Purpose: Keep the cache under its size limit
+# Input: Path of the slice about to be served, which is never evicted
+# Output: Least recently used slices removed from disk
+# Processing: Sorts cached slices by modification time and deletes the oldest until the total fits
+
+    def _evict(self, keep=None):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
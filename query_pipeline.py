@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+# Maximum number of operations allowed to run at once in each stage, across all sessions
+STAGE_LIMITS = {"embed": 4, "search": 4, "llm": 8}
+# Seconds a request may take end-to-end before it is cancelled
+REQUEST_TIMEOUT = 60
+
+
+class StageLimiter:
+    """
+    Bounds how many operations run concurrently in each pipeline stage and keeps
+    counters of running and waiting operations for queue-depth reporting.
+    """
+    def __init__(self, limits=None):
+        """
+        Initialize one semaphore and one pair of counters per stage.
+        """
+        self.limits = dict(STAGE_LIMITS if limits is None else limits)
+        self._semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in self.limits.items()}
+        self._running = {stage: 0 for stage in self.limits}
+        self._waiting = {stage: 0 for stage in self.limits}
+
+# Purpose: Hold a slot in a stage for the duration of an async block
+# Input: Stage name
+# Output: Async context manager
+# Processing: Counts the caller as waiting until the stage semaphore is acquired, then as running until the block exits.
+#             Only for natively async work, which stops when the block is cancelled; blocking calls use run_in_executor()
+
+    @asynccontextmanager
+    async def stage(self, name):
+        await self._acquire(name)
+        try:
+            yield
+        finally:
+            self._release(name)
+
+# Purpose: Run a blocking call on the default executor inside a stage slot
+# Input: Stage name, callable and its positional arguments
+# Output: Result of the call
+# Processing: Acquires a slot and releases it from the executor future's done-callback; the await is shielded, so a
+#             timed-out or cancelled request stops waiting but the slot stays taken until the thread really finishes
+
+    async def run_in_executor(self, name, fn, *args):
+        await self._acquire(name)
+        try:
+            future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        except BaseException:
+            self._release(name)
+            raise
+        future.add_done_callback(lambda done: self._executor_done(name, done))
+        return await asyncio.shield(future)
+
+    async def _acquire(self, name):
+        self._waiting[name] += 1
+        try:
+            await self._semaphores[name].acquire()
+        finally:
+            self._waiting[name] -= 1
+        self._running[name] += 1
+
+    def _release(self, name):
+        self._running[name] -= 1
+        self._semaphores[name].release()
+
+    def _executor_done(self, name, future):
+        self._release(name)
+        if not future.cancelled():
+            future.exception()  # Mark the error as retrieved when nobody is waiting for it any more
+
+# Purpose: Report the current load of every stage
+# Input: None
+# Output: Dictionary of stage name to running, waiting and limit counts
+# Processing: Copies the counters maintained by stage()
+
+    def stats(self):
+        return {
+            stage: {"running": self._running[stage], "waiting": self._waiting[stage], "limit": limit}
+            for stage, limit in self.limits.items()
+        }
+
+
+class QueryPipeline:
+    """
+    Runs an async query handler on one event loop shared by every Streamlit session.
+    Requests are submitted from script threads and come back as futures that can be
+    waited on with a deadline or cancelled when the user navigates away.
+    """
+    def __init__(self, handler, limits=None, timeout=REQUEST_TIMEOUT):
+        """
+        Start the event loop thread and create the stage limiter on it.
+        """
+        self.handler = handler
+        self.timeout = timeout
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="query-pipeline", daemon=True)
+        self._thread.start()
+        self.limiter = asyncio.run_coroutine_threadsafe(self._create_limiter(limits), self._loop).result()
+
+    async def _create_limiter(self, limits):
+        return StageLimiter(limits)
+
+# Purpose: Submit a query to the shared event loop
+# Input: Query string and optional timeout in seconds
+# Output: concurrent.futures.Future resolving to the response text
+# Processing: Schedules the handler under asyncio.wait_for so it is cancelled once the deadline passes
+
+    def submit(self, query, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._pending_lock:
+            self._pending += 1
+        future = asyncio.run_coroutine_threadsafe(self._run(query, timeout), self._loop)
+        future.add_done_callback(self._request_done)
+        return future
+
+    async def _run(self, query, timeout):
+        return await asyncio.wait_for(self.handler(query, self.limiter), timeout)
+
+    def _request_done(self, future):
+        with self._pending_lock:
+            self._pending -= 1
+
+# Purpose: Report queue depth across the pipeline
+# Input: None
+# Output: Dictionary with the number of pending requests and per-stage counters
+# Processing: Combines the pending counter with the limiter statistics
+
+    def stats(self):
+        return {"pending": self._pending, "stages": self.limiter.stats()}
+
+# Purpose: Stop the event loop thread
+# Input: None
+# Output: None
+# Processing: Asks the loop to stop and waits for its thread to exit
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
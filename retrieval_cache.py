@@ -0,0 +1,200 @@
+import os
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+INDEX_VERSION_FILE = "./milvus/index_version"
+VECTOR_CACHE_SIZE = 2048  # Query vectors kept in memory (about 1.5 KB each for a 384-dimensional model)
+RESULT_CACHE_SIZE = 1024  # Search results kept in memory (k chunks each)
+
+
+# Purpose: Normalize a query for exact-match cache lookups
+# Input: Query string
+# Output: Case-folded query with whitespace collapsed
+# Processing: Only removes differences the uncased embedding model ignores anyway, so punctuation and word order still matter
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least recently used mapping.
+    """
+    def __init__(self, max_entries):
+        """
+        Initialize the empty cache and its hit counters.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class IndexVersion:
+    """
+    Version stamp of the vector index, stored in a file next to the Milvus database so that
+    ingestion in any process invalidates cached search results. Reading it costs one stat call.
+    """
+    def __init__(self, path=INDEX_VERSION_FILE):
+        """
+        Initialize the stamp reader; the file is created on the first bump.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._memo = (None, "0")
+
+# Purpose: Return the current index version
+# Input: None
+# Output: Version string, "0" if the index has never been stamped
+# Processing: Rereads the stamp file only when its inode, modification time or size changed; every bump replaces
+#             the file with a new inode, so two bumps within one timestamp tick are still told apart
+
+    def current(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return "0"
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._memo[0] == signature:
+                return self._memo[1]
+            with open(self.path, "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            self._memo = (signature, version)
+            return version
+
+# Purpose: Mark the index as changed
+# Input: None
+# Output: New version string
+# Processing: Writes a fresh stamp atomically through a temporary file and os.replace
+
+    def bump(self):
+        version = f"{time.time_ns():x}"
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            stat = os.stat(self.path)
+            self._memo = ((stat.st_ino, stat.st_mtime_ns, stat.st_size), version)
+        return version
+
+
+class RetrievalCache:
+    """
+    Exact-match cache of query vectors and vector store search results, shared by all sessions.
+    Vectors are keyed by embedding model and normalized query; search results also by k and the
+    index version, so they are invalidated whenever ingestion changes the index.
+    """
+    def __init__(self, version_file=INDEX_VERSION_FILE, max_vectors=VECTOR_CACHE_SIZE, max_results=RESULT_CACHE_SIZE):
+        """
+        Initialize the vector and result caches and the index version stamp.
+        """
+        self.vectors = LRUCache(max_vectors)
+        self.results = LRUCache(max_results)
+        self.index_version = IndexVersion(version_file)
+
+    @staticmethod
+    def _model_id(embeddings):
+        return getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+# Purpose: Look up the cached vector of a query
+# Input: Embeddings instance and query string
+# Output: Tuple of (cache key, vector as a list of floats or None on a miss)
+# Processing: Vectors are stored as float32 arrays to keep the cache small; Milvus searches in float32 anyway
+
+    def get_vector(self, embeddings, query):
+        key = (self._model_id(embeddings), normalize_query(query))
+        vector = self.vectors.get(key)
+        return key, (vector.tolist() if vector is not None else None)
+
+    def put_vector(self, key, vector):
+        self.vectors.put(key, array("f", vector))
+
+# Purpose: Embed a query through the cache
+# Input: Embeddings instance and query string
+# Output: Vector as a list of floats
+# Processing: Returns the cached vector, otherwise embeds the normalized query and caches the result
+
+    def embed_query(self, embeddings, query):
+        key, vector = self.get_vector(embeddings, query)
+        if vector is None:
+            vector = embeddings.embed_query(key[1])
+            self.put_vector(key, vector)
+        return vector
+
+# Purpose: Look up the cached search results of a query
+# Input: Query string and number of documents k
+# Output: Tuple of (cache key, list of (Document, score) pairs or None on a miss)
+# Processing: The key includes the index version read before searching, so results of a search that races with ingestion are never served after it
+
+    def get_results(self, query, k):
+        key = (normalize_query(query), k, self.index_version.current())
+        results = self.results.get(key)
+        return key, (list(results) if results is not None else None)
+
+    def put_results(self, key, docs_and_scores):
+        self.results.put(key, tuple(docs_and_scores))
+
+# Purpose: Search the vector store through the cache
+# Input: Vector store, query string and number of documents k
+# Output: List of (Document, raw score) pairs
+# Processing: Serves cached results, otherwise embeds the normalized query (reusing a cached vector) and searches by vector
+
+    def search(self, vector_store, query, k):
+        results_key, docs_and_scores = self.get_results(query, k)
+        if docs_and_scores is not None:
+            return docs_and_scores
+
+        query_vector = self.embed_query(vector_store.embeddings, query)
+        docs_and_scores = vector_store.similarity_search_with_score_by_vector(query_vector, k=k)
+        self.put_results(results_key, docs_and_scores)
+        return docs_and_scores
+
+    def clear(self):
+        self.vectors.clear()
+        self.results.clear()
+
+    def stats(self):
+        return {
+            "vectors": len(self.vectors),
+            "vector_hits": self.vectors.hits,
+            "vector_misses": self.vectors.misses,
+            "results": len(self.results),
+            "result_hits": self.results.hits,
+            "result_misses": self.results.misses,
+            "index_version": self.index_version.current(),
+        }
@@ -0,0 +1,82 @@
+from langchain.schema import BaseRetriever
+import numpy as np
+from pydantic import Field
+from typing import List, Any
+
+# Purpose: Define the custom retriever logic for filtering relevant documents
+# Input: User query as a string
+# Output: List of relevant documents above the threshold score
+# Processing: Performs a similarity search on the vector store, filters documents based on score threshold
+class ScoreThresholdRetriever(BaseRetriever):
+    vector_store: Any = Field(..., description="Vector store for similarity search")
+    score_threshold: float = Field(default=0.1, description="Minimum score threshold for a document to be considered relevant")
+    k: int = Field(default=1, description="Number of documents to retrieve")
+    cache: Any = Field(default=None, description="Optional RetrievalCache shared across queries")
+
+    def get_relevant_documents(self, query:str) -> List[Any]:
+        """
+        Retrieve documents relevant to the query with a normalized score above the threshold.
+
+        Args:
+            query (str): Query string for searching the vector store.
+
+        Returns:
+            List[Document]: List of documents meeting the relevance criteria.
+        """
+        try:
+            if self.cache is not None:
+                docs_and_scores = self.cache.search(self.vector_store, query, self.k)
+            else:
+                docs_and_scores = self.vector_store.similarity_search_with_score(query, k=self.k)
+        except Exception as e:
+            print(f"Error during similarity search: {e}")
+            return [] # Return an empty list on search failure
+
+        return self.select_relevant_documents(docs_and_scores)
+
+    def select_relevant_documents(self, docs_and_scores) -> List[Any]:
+        """
+        Pick the highest scoring document whose normalized score is above the threshold.
+
+        Args:
+            docs_and_scores (List[Tuple[Document, float]]): Search results with raw distances.
+
+        Returns:
+            List[Document]: The most relevant document, or an empty list if none qualifies.
+        """
+        if not docs_and_scores:
+            return [] # Handle cases where no documents are retrieved
+
+        # Initialize variables for tracking the most relevant document
+        highest_score = -1
+        most_relevant_document = None
+
+        for doc, score in docs_and_scores:
+            normalized_score = self._normalize_score(score)
+
+            # Check if the document is relevant and has a higher score than the current highest score
+            if normalized_score >= self.score_threshold and normalized_score > highest_score:
+                highest_score = normalized_score
+                most_relevant_document = doc
+                
+                most_relevant_document.metadata["score"] = normalized_score
+                most_relevant_document.metadata["title"] = doc.metadata.get("title", "Untitled")
+                most_relevant_document.metadata["source"] = doc.metadata.get("source", "Unknown")
+
+        return [most_relevant_document] if most_relevant_document else []
+    
+    @staticmethod
+    def _normalize_score(score):
+        """
+        Normalize the score to a range of [0, 1].
+
+        Args:
+            score (float): Raw similarity score.
+
+        Returns:
+            float: Normalized similarity score.
+        """
+        # Assuming Milvus L2 distance, adjust based on your distance metric
+        max_distance = np.sqrt(2)
+        normalized = 1 - (score / max_distance)
+        return max(0, min(1, normalized))